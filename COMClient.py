@@ -1,84 +1,103 @@
 #!/usr/bin/env python
 
 import serial
+import io
+import os
+import errno
 import threading
-import select
-from Logger import Logger
-from datetime import datetime
+import Queue
+from Transport import Transport, MarkedMessage
 
-class COMMarkedMessage:
-    def __init__(self, payload, timestamp=None):
-        self.payload = payload
-        self.timestamp = timestamp
+COMMarkedMessage = MarkedMessage
 
-class COMClient(threading.Thread):
+class COMClient(Transport):
 ###
 # outgoing means going from PC to robot
 # incomming means going from robot to PC
 # log goes FROM this class
+#
+# On posix the port descriptor is polled by TransportLoop directly.
+# Elsewhere a helper thread blocks until at least one byte arrives and then
+# takes everything that is already buffered in a single read, and writes are
+# handed to a writer thread, so a blocking write never stalls the loop.
 ###
-    def __init__(self, port, baudrate, outgoing_q, incomming_q):
-        super(COMClient, self).__init__()
+    name = "COM"
     
-        self._alive = threading.Event()
-        self._alive.set()
+    def __init__(self, port, baudrate, outgoing_q, incomming_q):
+        Transport.__init__(self, outgoing_q, incomming_q)
         
-        self.outgoing = outgoing_q
-        self.incomming = incomming_q
-       
-        self._outbuffer = ''
-        self._inbuffer = ''
-       
         # throwing instruction (throws IOError)
         self._socket = serial.Serial(port=port, baudrate=baudrate, 
             bytesize=serial.EIGHTBITS, stopbits=serial.STOPBITS_ONE, 
-            parity=serial.PARITY_NONE, timeout=0.001, writeTimeout=0.001)
+            parity=serial.PARITY_NONE, timeout=0.1, writeTimeout=1.0)
+        # Serial inherits fileno() from io.RawIOBase, it raises where there is no descriptor
+        try:
+            self._fd = self._socket.fileno()
+        except (AttributeError, IOError, ValueError, io.UnsupportedOperation):
+            self._fd = None
+        self._writer = None
+        self._writeQueue = Queue.Queue()
+        
+    def fileno(self):
+        return self._fd
         
-    def run(self, timeout=None):
-        while self._alive.isSet():
-            timestamp = datetime.now()
+    def _read(self):
+        try:
+            return os.read(self._fd, 4096)
+        except OSError as e:
+            if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return None
+            raise
+            
+    def _write(self, data):
+        if self._fd is None:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._writeLoop, name=self.name + "Writer")
+                self._writer.daemon = True
+                self._writer.start()
+            self._writeQueue.put(data)
+            return len(data)
+        try:
+            return os.write(self._fd, data)
+        except OSError as e:
+            if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return None
+            raise
+            
+    def _writeLoop(self):
+        while True:
+            data = self._writeQueue.get()
+            if data is None:
+                return
             try:
-                text = self._socket.read(1)
-            except serial.SerialException as e:
-                Logger.getInstance().error("Error in reading from COM port: " + str(e))
+                self._socket.write(data)
+            except Exception as e:
+                if self._alive.isSet():
+                    self._loop.call(self._fail, "sending", e)
                 return
-            if text:
-                self._inbuffer += text
-                n = self._socket.inWaiting()
-                if n:
-                    self._inbuffer += self._socket.read(n)
-                splitted = self._inbuffer.splitlines()
-                if self._inbuffer.endswith('\n') or len(splitted) == 0:
-                    self._inbuffer = ''
-                else:
-                    self._inbuffer = splitted.pop()
-                for line in splitted:
-                    if len(line):
-                        self.incomming.put(COMMarkedMessage(line, timestamp))
-            elif len(self._outbuffer) > 0:
-                try:
-                    send = self._socket.write(self._outbuffer)
-                except Exception as e:
-                    Logger.getInstance().error("Error in sending via COM port: " + str(e))
-                    break
-                else:
-                    self._outbuffer = self._outbuffer[send:]
-            elif not self.outgoing.empty():
-                self._outbuffer += self.outgoing.get() 
-        self._alive.set()
-
-    def join(self, timeout=None):
-        self._alive.clear()
-        threading.Thread.join(self, timeout)
+            
+    def _readBlocking(self):
+        text = self._socket.read(1)
+        if text:
+            n = self._socket.inWaiting()
+            if n:
+                text += self._socket.read(n)
+        return text
+        
+    def _close(self):
+        if self._writer is not None:
+            self._writeQueue.put(None)
         self._socket.close()
 
 if __name__ == '__main__':   
+    import sys
     import Queue
-    out_q = Queue.Queue()
+    from WakeupQueue import WakeupQueue
+    out_q = WakeupQueue()
     in_q = Queue.Queue()
-    client = TCPClient(('192.168.50.2', 4000), out_q, in_q)
+    client = COMClient(sys.argv[1], int(sys.argv[2]), out_q, in_q)
     client.start()
     
     while True:
         msg = in_q.get(True)
-        print msg
\ No newline at end of file
+        print msg.payload
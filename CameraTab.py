@@ -9,7 +9,6 @@ from Logger import Logger
 from CameraThread import CameraThread
 from COMMngr import COMMngr
 from COMSSClient import COMSSClient
-import myThread
         
 class CameraTab(QtGui.QWidget):
     sendCommand = QtCore.pyqtSignal(str)
@@ -20,6 +19,7 @@ class CameraTab(QtGui.QWidget):
         
         self.indicatorBuffer = []
         self.maxIndicator = 0
+        self.telemetryStore = None
         
         self.cameraThreadObject = CameraThread()
         self.cameraThread = QtCore.QThread()
@@ -61,10 +61,8 @@ class CameraTab(QtGui.QWidget):
     def __del__(self):
         self.cameraThread.quit()
         self.cameraThread.wait()
-        
-        if self.radioThread:
-            self.radioThread.quit()
-            self.radioThread.wait()
+        if hasattr(self, 'radioClient'):
+            self.radioClient.stop()
         
     @QtCore.pyqtSlot()
     def _connectRadio(self):
@@ -75,23 +73,20 @@ class CameraTab(QtGui.QWidget):
         br = str(self.radioBaudrateEdit.text())
        
         try:
-            self.radioThreadObject = COMSSClient(com, br)
+            self.radioClient = COMSSClient(com, br)
         except Exception as e:
             Logger.getInstance().error("Cannot establish radio connection: " + str(e))
         else:
-            self.radioThread = myThread.makeThread(self.radioThreadObject)
-            self.radioThreadObject.arrived.connect(lambda x: self._radioMessageArrived(x.payload))
-            myThread.startThread(self.radioThreadObject)
+            self.radioClient.arrived.connect(self._radioMessageArrived)
+            self.radioClient.start()
             self.radioStatusLabel.show()
             Logger.getInstance().log("Radio connection established on " + com + " @" + br)
             self.radioConnectButton.setText("Disconnect")
 
     def _tryDisconnectRadio(self):
         if self._radioIsConnected():
-            self.radioThread.quit()
-            self.radioThread.wait()
-            del self.radioThread
-            del self.radioThreadObject
+            self.radioClient.stop()
+            del self.radioClient
             self.radioConnectButton.setText("Connect")
             self.radioTestLabel.setText("Not tested")
             self.radioStatusLabel.hide()
@@ -103,8 +98,9 @@ class CameraTab(QtGui.QWidget):
     def _radioIsConnected(self):
         return self.radioConnectButton.text() == "Disconnect"        
         
-    @QtCore.pyqtSlot(str)
-    def _radioMessageArrived(self, msg):
+    @QtCore.pyqtSlot(object)
+    def _radioMessageArrived(self, message):
+        msg = message.payload
         if msg == "I am alive!":
             self._radioTestTxPassed()
         else:
@@ -145,7 +141,7 @@ class CameraTab(QtGui.QWidget):
            
     def _sendToRadio(self, str):
         try:
-            self.radioThreadObject._outgoing.put("<"+str+">")
+            self.radioClient.send("<"+str+">")
         except (NameError, AttributeError):
             return False
         return True
@@ -160,8 +156,13 @@ class CameraTab(QtGui.QWidget):
         self.telemetryY.setText("%.2f" % (telemetry[1]))
         self.telemetryODeg.setText("%.2f" % (telemetry[2]*180.0/math.pi))
         self.telemetryORad.setText("%.2f" % (telemetry[2]))
-        Logger.getInstance().debug("X: %.5f Y: %.5f O: %.7f rad" % telemetry)
+        if self.telemetryStore is not None:
+            self.telemetryStore.append('camera', None, telemetry[:3])
+        Logger.getInstance().debug("X: %.5f Y: %.5f O: %.7f rad", *telemetry, source="camera")
       
+    def setTelemetryStore(self, store):
+        self.telemetryStore = store
+        
     @QtCore.pyqtSlot()
     def _cameraConnected(self):
         self.settingsStartStopBtn.setText("Stop")
@@ -2,13 +2,26 @@
 
 from PyQt4 import QtCore, QtGui
 from PyQt4.QtCore import Qt
+import random
+import time
 
 from TCPClient import TCPClient
 from COMClient import COMClient
 from Logger import Logger
 
 class ConnectionManager(QtCore.QObject):
+###
+# Transports report their own failure through linkLost (emitted on the
+# transport thread, handled on this object's thread). A lost link is
+# reopened with exponential backoff and jitter, then active "log ..."
+# subscriptions are replayed. result(False) is emitted only when giving up.
+###
     result = QtCore.pyqtSignal(bool)
+    linkLost = QtCore.pyqtSignal(object, str)
+    
+    RECONNECT_BASE_S = 0.2
+    RECONNECT_MAX_S = 5.0
+    RECONNECT_ATTEMPTS = 10
     
     def __init__(self, incomming_q, outgoing_q):
         super(ConnectionManager, self).__init__()
@@ -17,6 +30,10 @@ class ConnectionManager(QtCore.QObject):
         self.out_q = outgoing_q
         self.tcpClient = None
         self.comClient = None
+        self.parameters = None
+        self.reconnectAttempt = 0
+        self.lostAt = None
+        self.linkLost.connect(self.handleLinkLost)
         
     def __del__(self):
         if self.tcpClient is not None:
@@ -24,20 +41,56 @@ class ConnectionManager(QtCore.QObject):
         if self.comClient is not None:
             self.comClient.join()
     
-    @QtCore.pyqtSlot()
-    def check(self):
-        if self.tcpClient and not self.tcpClient.isAlive():
-            self.tcpClient = None
-            Logger.getInstance().error("WiFi connection closed unexpectedly")
-            self.result.emit(False)
-        if self.comClient and not self.comClient.isAlive():
-            self.comClient = None
-            Logger.getInstance().error("COM connection closed unexpectedly")
+    @QtCore.pyqtSlot(object, str)
+    def handleLinkLost(self, client, reason):
+        if client is not self.tcpClient and client is not self.comClient:
+            return # stopped or replaced in the meantime
+        self.lostAt = time.time()
+        silence = client.failedAt - (client.lastReceived or client.startedAt)
+        Logger.getInstance().error("%s connection lost (%s), detected %.1fms after last data, handled %.1fms after failure" % (
+            client.name, reason, silence*1000.0, (self.lostAt - client.failedAt)*1000.0))
+        self.logCounters(client)
+        self.tcpClient = None
+        self.comClient = None
+        self.reconnectAttempt = 0
+        self.scheduleReconnect()
+        
+    def scheduleReconnect(self):
+        if self.reconnectAttempt >= self.RECONNECT_ATTEMPTS:
+            Logger.getInstance().error("Giving up reconnecting after %d attempts" % (self.reconnectAttempt))
+            self.parameters = None
             self.result.emit(False)
+            return
+        delay = min(self.RECONNECT_MAX_S, self.RECONNECT_BASE_S * 2**self.reconnectAttempt)
+        delay *= random.uniform(0.5, 1.0)
+        self.reconnectAttempt += 1
+        Logger.getInstance().info("Reconnecting in %.2fs (attempt %d)" % (delay, self.reconnectAttempt))
+        self.reconnectTimer.start(int(delay*1000))
+        
+    @QtCore.pyqtSlot()
+    def reconnect(self):
+        if self.parameters is None:
+            return
+        if self.open(self.parameters):
+            Logger.getInstance().info("Reconnected after %d attempts, recovery took %.1fms" % (
+                self.reconnectAttempt, (time.time() - self.lostAt)*1000.0))
+            self.replaySubscriptions()
+        else:
+            self.scheduleReconnect()
+            
+    def replaySubscriptions(self):
+        if hasattr(self.out_q, 'subscriptions'):
+            for command in self.out_q.subscriptions():
+                Logger.getInstance().info("Replaying subscription: " + command.strip())
+                self.out_q.put(command)
         
     @QtCore.pyqtSlot(tuple)    
     def connect(self, parameters):
         self.stopAll()
+        self.parameters = parameters
+        self.result.emit(self.open(parameters))
+        
+    def open(self, parameters):
         if parameters[0] == "WiFi":
             try:
                 self.tcpClient = TCPClient((str(parameters[1]), int(parameters[2])), self.out_q, self.in_q)
@@ -45,6 +98,7 @@ class ConnectionManager(QtCore.QObject):
                 self.tcpClient = None
                 Logger.getInstance().error("Cannot start WiFi connection: " + str(e))
             else:
+                self.tcpClient.onClosed = self.linkLost.emit
                 self.tcpClient.start()
                 Logger.getInstance().info("Connected to WiFi server")
         elif parameters[0] == "COM":
@@ -54,25 +108,36 @@ class ConnectionManager(QtCore.QObject):
                 self.comClient = None
                 Logger.getInstance().error("Cannot start serial connection: " + str(e))
             else:
+                self.comClient.onClosed = self.linkLost.emit
                 self.comClient.start()
                 Logger.getInstance().info("Connected to COM server")
-        if self.comClient or self.tcpClient:
-            self.result.emit(True)
-        else:
-            self.result.emit(False)
+        return bool(self.comClient or self.tcpClient)
         
     @QtCore.pyqtSlot()
     def setup(self):
-        self.runTimer = QtCore.QTimer()
-        self.runTimer.timeout.connect(self.check)
-        self.runTimer.start(100)
+        self.reconnectTimer = QtCore.QTimer()
+        self.reconnectTimer.setSingleShot(True)
+        self.reconnectTimer.timeout.connect(self.reconnect)
         
     def stopAll(self):
+        self.reconnectTimer.stop()
+        self.parameters = None
         if self.tcpClient is not None:
             self.tcpClient.join()
+            self.logCounters(self.tcpClient)
             self.tcpClient = None
             Logger.getInstance().info("Stopping TCP Client")
         if self.comClient is not None:
             self.comClient.join()
+            self.logCounters(self.comClient)
             self.comClient = None
-            Logger.getInstance().info("Stopping COM Client")
\ No newline at end of file
+            Logger.getInstance().info("Stopping COM Client")
+            
+    def logCounters(self, client):
+        counters = client.counters()
+        Logger.getInstance().info("%s link sent %d commands (%d bytes) in %d writes, %.2f writes per command" % (
+            client.name, counters['commands'], counters['bytesSent'], counters['writes'], counters['writesPerCommand']))
+        if hasattr(self.out_q, 'laneStats'):
+            for name, stats in self.out_q.laneStats().items():
+                Logger.getInstance().info("Outgoing %s lane: %d queued, %d merged, %d waiting, mean wait %.1fms, max wait %.1fms" % (
+                    name, stats['enqueued'], stats['merged'], stats['depth'], stats['waitMean']*1000.0, stats['waitMax']*1000.0))
\ No newline at end of file
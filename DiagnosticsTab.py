@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+from PyQt4 import QtCore, QtGui
+from PyQt4.QtCore import Qt
+
+class DiagnosticsTab(QtGui.QWidget):
+###
+# Live view of MsgDispatcher per rule statistics, unmatched messages and
+# ingest latency per hop (LatencyStats), refreshed every REFRESH_MS while
+# visible. Display is marked stale when endToEnd p95 exceeds STALE_MS.
+###
+    REFRESH_MS = 1000
+    STALE_MS = 100.0
+    LATENCY_COLUMNS = ["Hop", "Samples", "p50 [ms]", "p95 [ms]", "p99 [ms]", "Max [ms]"]
+    COLUMNS = ["Rule", "Tried", "Hits", "Hits/s", "Match [us]", "Match total [ms]", "Handler [us]", "Handler total [ms]", "Worker"]
+    
+    def __init__(self, parent=None):
+        super(DiagnosticsTab, self).__init__(parent)
+        self.dispatcher = None
+        self.latency = None
+        self.lastHits = {}
+        self.lastRefresh = None
+        
+        self.setupGUI()
+        
+        self.refreshTimer = QtCore.QTimer(self)
+        self.refreshTimer.timeout.connect(self.refresh)
+        self.refreshTimer.start(self.REFRESH_MS)
+        
+    def setDispatcher(self, dispatcher):
+        self.dispatcher = dispatcher
+        self.refresh()
+        
+    def setLatency(self, latency):
+        self.latency = latency
+        self.refresh()
+        
+    def resetDefault(self):
+        if self.dispatcher is not None:
+            self.dispatcher.reset_stats()
+        if self.latency is not None:
+            self.latency.reset()
+        self.lastHits = {}
+        self.refresh()
+        
+    @QtCore.pyqtSlot()
+    def refresh(self):
+        if self.dispatcher is None or not self.isVisible():
+            return
+        now = QtCore.QTime.currentTime()
+        elapsed = self.lastRefresh.msecsTo(now) / 1000.0 if self.lastRefresh is not None else 0.0
+        self.lastRefresh = now
+        
+        stats = self.dispatcher.stats()
+        self.rulesTable.setRowCount(len(stats))
+        for row, rule in enumerate(stats):
+            rate = (rule['hits'] - self.lastHits.get(rule['rule'], rule['hits'])) / elapsed if elapsed > 0 else 0.0
+            self.lastHits[rule['rule']] = rule['hits']
+            values = [rule['rule'], "%d" % rule['tried'], "%d" % rule['hits'], "%.1f" % rate,
+                "%.2f" % (rule['match_mean']*1e6), "%.1f" % (rule['match_time']*1e3),
+                "%.2f" % (rule['handler_mean']*1e6), "%.1f" % (rule['handler_time']*1e3), ""]
+            if 'worker' in rule:
+                worker = rule['worker']
+                values[-1] = "queued %d/%d (max %d), dropped %d" % (worker['depth'], worker['maxsize'], worker['maxDepth'], worker['dropped'])
+            for column, value in enumerate(values):
+                item = QtGui.QTableWidgetItem(value)
+                if column > 0:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.rulesTable.setItem(row, column, item)
+                
+        self.missesLabel.setText("Unmatched messages: %d" % (self.dispatcher.misses()))
+        self.missesList.clear()
+        self.missesList.addItems(list(self.dispatcher.recent_misses))
+        
+        if self.latency is not None:
+            self.refreshLatency()
+            
+    def refreshLatency(self):
+        report = self.latency.report()
+        self.latencyTable.setRowCount(len(self.latency.HOPS))
+        for row, hop in enumerate(self.latency.HOPS):
+            stats = report[hop]
+            values = [hop, "%d" % stats['count']] + ["%.3f" % (stats[key]*1e3) for key in ('p50', 'p95', 'p99', 'max')]
+            for column, value in enumerate(values):
+                item = QtGui.QTableWidgetItem(value)
+                if column > 0:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.latencyTable.setItem(row, column, item)
+        age = report['endToEnd']['p95'] * 1e3
+        stale = report['endToEnd']['window'] > 0 and age > self.STALE_MS
+        self.staleLabel.setText("Display age p95: %.1f ms%s" % (age, " - STALE" if stale else ""))
+        self.staleLabel.setStyleSheet("QLabel { color: red; }" if stale else "")
+        
+    @QtCore.pyqtSlot()
+    def exportLatency(self):
+        if self.latency is None:
+            return
+        path = QtGui.QFileDialog.getSaveFileName(self, "Export latency", "latency.json", "JSON (*.json)")
+        if path:
+            self.latency.export(str(path))
+        
+    def setupGUI(self):
+        layout = QtGui.QVBoxLayout()
+        layout.setMargin(10)
+        self.setLayout(layout)
+        
+        self.rulesTable = QtGui.QTableWidget(0, len(self.COLUMNS))
+        self.rulesTable.setHorizontalHeaderLabels(self.COLUMNS)
+        self.rulesTable.setEditTriggers(QtGui.QAbstractItemView.NoEditTriggers)
+        self.rulesTable.verticalHeader().setVisible(False)
+        self.rulesTable.horizontalHeader().setResizeMode(0, QtGui.QHeaderView.Stretch)
+        layout.addWidget(self.rulesTable, 3)
+        
+        missesLayout = QtGui.QHBoxLayout()
+        self.missesLabel = QtGui.QLabel("Unmatched messages: 0")
+        resetBtn = QtGui.QPushButton("Reset")
+        resetBtn.clicked.connect(self.resetDefault)
+        missesLayout.addWidget(self.missesLabel)
+        missesLayout.addStretch(1)
+        missesLayout.addWidget(resetBtn)
+        layout.addLayout(missesLayout)
+        
+        self.missesList = QtGui.QListWidget()
+        layout.addWidget(self.missesList, 1)
+        
+        latencyLayout = QtGui.QHBoxLayout()
+        self.staleLabel = QtGui.QLabel("Display age p95: -")
+        exportBtn = QtGui.QPushButton("Export latency")
+        exportBtn.clicked.connect(self.exportLatency)
+        latencyLayout.addWidget(self.staleLabel)
+        latencyLayout.addStretch(1)
+        latencyLayout.addWidget(exportBtn)
+        layout.addLayout(latencyLayout)
+        
+        self.latencyTable = QtGui.QTableWidget(0, len(self.LATENCY_COLUMNS))
+        self.latencyTable.setHorizontalHeaderLabels(self.LATENCY_COLUMNS)
+        self.latencyTable.setEditTriggers(QtGui.QAbstractItemView.NoEditTriggers)
+        self.latencyTable.verticalHeader().setVisible(False)
+        self.latencyTable.horizontalHeader().setResizeMode(0, QtGui.QHeaderView.Stretch)
+        layout.addWidget(self.latencyTable, 1)
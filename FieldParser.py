@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+
+import re
+
+class FieldMatch(tuple):
+###
+# Match-like result of FieldParser, holds already converted values
+# group(n) is 1-based like re match objects
+###
+    def group(self, n):
+        return self[n-1]
+        
+    def groups(self):
+        return tuple(self)
+
+class FieldParser(object):
+###
+# Converts the groups of a hot message regex, e.g. [Tel] and [Speed]
+#   FieldParser(r"^\[Tel\] X: (-?\d+.\d+) Y: (-?\d+.\d+) O: (-?\d+.\d+)$")
+# One match, then all groups converted with a single map() call instead
+# of group(n) and convert per field. Returns FieldMatch or None.
+# This is not a regex-free split on the fixed layout. float() also takes
+# nan, inf or 1.5e3, which the field regexes reject, so split fields would
+# have to be checked against their groups, and with those checks a split
+# costs more than the one match (1.65us against 1.24us per [Tel] line).
+# The match stays, the gain is the conversion, see benchmarks.ParserBench.
+###
+    def __init__(self, regex, convert=float):
+        self.regex_c = re.compile(regex)
+        self.convert = convert
+        
+    def __call__(self, message):
+        match = self.regex_c.match(message)
+        if match:
+            try:
+                return FieldMatch(map(self.convert, match.groups()))
+            except ValueError:
+                pass
+        return None
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+import threading
+import time
+import Queue
+
+from Logger import Logger
+
+class HandlerWorker(Queue.Queue):
+###
+# Runs a dispatcher handler on its own thread(s), so a slow consumer
+# (recorder, analytics...) never delays dispatch of the other rules
+# Being a Queue.Queue it can be registered in MsgDispatcher as any handler:
+#   dispatcher.register(r"^\[Tel\] ...", HandlerWorker(recorder.store, 1000, HandlerWorker.DROP_OLDEST))
+# maxsize bounds the backlog, policy decides what happens when it is full:
+#   BLOCK       - dispatch waits for a free slot (lossless, backpressure)
+#   DROP_NEWEST - the new payload is discarded
+#   DROP_OLDEST - the oldest waiting payload is discarded
+# Handler exceptions are logged and do not stop the worker.
+###
+    BLOCK, DROP_NEWEST, DROP_OLDEST = ("block", "drop newest", "drop oldest")
+    
+    def __init__(self, handler, maxsize=1000, policy=DROP_OLDEST, threads=1, name=None):
+        Queue.Queue.__init__(self, maxsize)
+        self.handler = handler
+        self.policy = policy
+        self.name = name or getattr(handler, '__name__', "handler")
+        self.processed = 0
+        self.dropped = 0
+        self.maxDepth = 0
+        self.busyTime = 0.0
+        self._stop = object()
+        self._threads = []
+        for i in xrange(threads):
+            thread = threading.Thread(target=self._work, name="%s worker %d" % (self.name, i))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+            
+    def put(self, item, block=True, timeout=None):
+        if self.policy == self.BLOCK or item is self._stop:
+            Queue.Queue.put(self, item, block, timeout)
+            return
+        self.not_full.acquire()
+        try:
+            if 0 < self.maxsize <= self._qsize():
+                self.dropped += 1
+                if self.policy == self.DROP_NEWEST:
+                    return
+                self._get()
+                self.unfinished_tasks -= 1
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+        finally:
+            self.not_full.release()
+            
+    def _put(self, item):
+        Queue.Queue._put(self, item)
+        self.maxDepth = max(self.maxDepth, len(self.queue))
+        
+    def _work(self):
+        while True:
+            item = self.get()
+            try:
+                if item is self._stop:
+                    return
+                start = time.time()
+                try:
+                    self.handler(item)
+                except Exception as e:
+                    Logger.getInstance().error("%s handler failed: %s" % (self.name, e))
+                self.busyTime += time.time() - start
+                self.processed += 1
+            finally:
+                self.task_done()
+                
+    def stop(self, timeout=None):
+        threads, self._threads = self._threads, []
+        for _ in threads:
+            Queue.Queue.put(self, self._stop)
+        for thread in threads:
+            thread.join(timeout)
+            
+    def workerStats(self):
+        return {'depth': self.qsize(), 'maxsize': self.maxsize, 'maxDepth': self.maxDepth, 'policy': self.policy,
+            'processed': self.processed, 'dropped': self.dropped, 'busyTime': self.busyTime}
+            
+if __name__ == '__main__':
+    from MsgDispatcher import MsgDispatcher
+    from Transport import MarkedMessage
+    
+    def slowRecorder(payload):
+        time.sleep(0.001)
+    
+    dispatcher = MsgDispatcher("odin>", instrumented=True)
+    recorder = HandlerWorker(slowRecorder, 100, HandlerWorker.DROP_OLDEST)
+    dispatcher.register(r"^\[Tel\] (.*)$", recorder)
+    start = time.time()
+    for i in xrange(10000):
+        dispatcher.dispatch(MarkedMessage("odin>[Tel] X: %d.0 Y: 0.0 O: 0.0" % i))
+    print "Dispatched 10000 lines in %.1fms" % ((time.time() - start)*1000)
+    recorder.stop(1.0)
+    print recorder.workerStats()
@@ -4,10 +4,36 @@ from PyQt4 import QtCore, QtGui
 from PyQt4.QtCore import Qt
 
 from MsgDispatcher import MsgDispatcher
-import Queue
+from FieldParser import FieldParser
+from LatencyStats import LatencyStats
+from Monotonic import monotonic
+import threading
 from datetime import datetime
 
 class IncommingMessageHandler(QtCore.QObject):
+###
+# Dispatches incomming messages and publishes results as Qt signals
+# Transports put() framed lines directly, dispatch runs on the transport
+# thread and signals are queued to the receivers' threads.
+# With batchInterval > 0 signals are not emitted one by one. Results are
+# collected and sent every batchInterval seconds as one batch signal, a list
+# of (signal, args), by a timer in the handler's own thread (see start()).
+# Receiver in the GUI thread passes it to deliver(), which emits them there,
+# so every connected slot runs directly.
+# Console lines in a batch come as a single incomming block joined by '\n'.
+# State streams (battery, CPU, memory, pose, speed) are conflated, a batch
+# carries only the newest value of each. Events (reset, RC5, ...) are all
+# kept. Events and state go in arrival order, a newer state sample takes
+# the place at the end of the batch, so e.g. a reset never wipes state that
+# came after it. While a batch is not yet delivered no new one is sent, so
+# a slow GUI gets fresh state instead of a growing backlog. A batch not
+# delivered within IN_FLIGHT_TIMEOUT seconds is counted as lost.
+# Hop latencies go to self.latency (LatencyStats). A monotonic clock read
+# costs ~2us in Python 2, so transport/dispatch are timed on every
+# SAMPLE_EVERY-th line only, queue/apply/endToEnd once per batch.
+# Every state sample, before conflation, is appended to store
+# (TelemetryStore) when one is given, stamped with its monotonic arrival.
+###
     incomming = QtCore.pyqtSignal(str)
     updBatteryVoltage = QtCore.pyqtSignal(float)
     updCpuUsage = QtCore.pyqtSignal(float)
@@ -18,58 +44,174 @@ class IncommingMessageHandler(QtCore.QObject):
     reset = QtCore.pyqtSignal()
     radioTxPassedTest = QtCore.pyqtSignal()
     cameraDebug = QtCore.pyqtSignal(str)
+    batch = QtCore.pyqtSignal(object)
     
-    def __init__(self, input_queue):
+    STATE_STREAMS = ('updBatteryVoltage', 'updCpuUsage', 'updMemUsage', 'updTelemetry', 'updCurrentSpeed')
+    SAMPLE_EVERY = 8
+    IN_FLIGHT_TIMEOUT = 1.0
+    
+    def __init__(self, batchInterval=0.0, store=None):
         super(IncommingMessageHandler, self).__init__()
-        self.input_queue = input_queue
-        self.dispatcher = MsgDispatcher("odin>")
-        self.setupDispatcher()
-       
-    QtCore.pyqtSlot()    
-    def loop(self):
+        self.batchInterval = batchInterval
+        self.store = store
         self._alive = True
-        while self._alive:
-            try:
-                message = self.input_queue.get(True, 0.01)
-            except Queue.Empty:
-                pass
-            else:
+        self._lock = threading.Lock()
+        self._pending = []
+        self._lines = []
+        self._latest = {}
+        self._inFlight = False
+        self._flushTimer = None
+        self.conflated = dict.fromkeys(self.STATE_STREAMS, 0)
+        self.deferred = 0
+        self.lost = 0
+        self.latency = LatencyStats()
+        self._unsampled = 0
+        self._oldestArrived = None
+        self._batchSent = None
+        self.dispatcher = MsgDispatcher("odin>", instrumented=True)
+        self.setupDispatcher()
+        
+    # called by transports for every framed message
+    def put(self, message):
+        with self._lock:
+            if not self._alive:
+                return
+            if self.batchInterval and self._oldestArrived is None:
+                self._oldestArrived = message.arrived
+            self._unsampled += 1
+            if self._unsampled < self.SAMPLE_EVERY:
                 self.dispatcher.dispatch(message)
+                return
+            self._unsampled = 0
+            start = monotonic()
+            self.dispatcher.dispatch(message)
+            end = monotonic()
+        if message.arrived is not None:
+            self.latency.add('transport', start - message.arrived)
+        self.latency.add('dispatch', end - start)
+       
+    @QtCore.pyqtSlot()
+    def start(self):
+        if self.batchInterval and self._flushTimer is None:
+            self._flushTimer = QtCore.QTimer(self)
+            self._flushTimer.timeout.connect(self.flush)
+            self._flushTimer.start(max(1, int(self.batchInterval * 1000)))
         
-    QtCore.pyqtSlot()
+    @QtCore.pyqtSlot()
     def stop(self):
-        self._alive = False
+        with self._lock:
+            self._alive = False
+            self._pending = []
+            self._lines = []
+            self._latest = {}
+            self._oldestArrived = None
+        for worker in self.dispatcher.workers():
+            worker.stop(1.0)
         
-    def setupDispatcher(self):
-        def p(payload):
-            print "Default: " + payload.message
+    @QtCore.pyqtSlot()
+    def flush(self):
+        if not self._alive and self._flushTimer is not None:
+            self._flushTimer.stop()
+        with self._lock:
+            if not self._pending and not self._lines:
+                return
+            if self._inFlight:
+                if monotonic() - self._batchSent[0] < self.IN_FLIGHT_TIMEOUT:
+                    self.deferred += 1
+                    return
+                self.lost += 1 # receiver gone or not connected yet
+            batch = [entry for entry in self._pending if entry is not None]
+            lines = self._lines
+            self._pending, self._lines, self._latest = [], [], {}
+            self._inFlight = True
+            oldest, self._oldestArrived = self._oldestArrived, None
+        if lines:
+            batch.append((self.incomming, ("\n".join(lines),)))
+        self._batchSent = (monotonic(), oldest)
+        self.batch.emit(batch)
+            
+    # to be called in the receiving (GUI) thread with a batch signal argument
+    def deliver(self, batch):
+        start = monotonic()
+        try:
+            for signal, args in batch:
+                signal.emit(*args)
+        finally:
+            end = monotonic()
+            sent, oldest = self._batchSent
+            self._inFlight = False
+        self.latency.add('queue', start - sent)
+        self.latency.add('apply', end - start)
+        if oldest is not None:
+            self.latency.add('endToEnd', end - oldest)
             
+    def conflationStats(self):
+        with self._lock:
+            stats = dict(self.conflated)
+        stats['total'] = sum(stats.values())
+        stats['deferred'] = self.deferred
+        stats['lost'] = self.lost
+        return stats
+            
+    def _emit(self, signal, *args):
+        if self.batchInterval:
+            self._pending.append((signal, args))
+        else:
+            signal.emit(*args)
+        
+    # _latest keeps the position of the newest sample of a stream in _pending
+    def _state(self, name, *args):
+        if not self.batchInterval:
+            getattr(self, name).emit(*args)
+            return
+        position = self._latest.get(name)
+        if position is not None:
+            self._pending[position] = None
+            self.conflated[name] += 1
+        self._latest[name] = len(self._pending)
+        self._pending.append((getattr(self, name), args))
+        
+    def _sample(self, name, stream, payload, values, *args):
+        if self.store is not None:
+            self.store.append(stream, payload.arrived, values)
+        self._state(name, *args)
+        
+    def _line(self, message):
+        if self.batchInterval:
+            self._lines.append(message)
+        else:
+            self.incomming.emit(message)
+        
+    def setupDispatcher(self):
+        # unmatched messages are counted by the dispatcher, see DiagnosticsTab
         self.dispatcher.register_all(
-            lambda payload: self.incomming.emit(payload.message))
-        self.dispatcher.register_default(p)
+            lambda payload: self._line(payload.message))
+        
+        def scalar(name, stream, convert):
+            def handler(payload):
+                value = convert(payload.match.group(1))
+                self._sample(name, stream, payload, (value,), value)
+            return handler
         
         self.dispatcher.register(r"^Battery voltage: (\d+\.\d+)V$", 
-            lambda payload: self.updBatteryVoltage.emit(float(payload.match.group(1))))
+            scalar('updBatteryVoltage', 'battery', float))
         self.dispatcher.register(r"^CPU usage: (.*)$",
-            lambda payload: self.updCpuUsage.emit(float(payload.match.group(1))))
+            scalar('updCpuUsage', 'cpu', float))
         self.dispatcher.register(r"^Available memory: (\d+)kB$",
-            lambda payload: self.updMemUsage.emit(int(payload.match.group(1))))
-        self.dispatcher.register(r"^\[Tel\] X: (-?\d+.\d+) Y: (-?\d+.\d+) O: (-?\d+.\d+)$",
-            lambda payload: self.updTelemetry.emit((
-            float(payload.match.group(1)), 
-            float(payload.match.group(2)), 
-            float(payload.match.group(3)),
-            datetime.now())))
-        self.dispatcher.register(r"^\[Speed\] L: (-?\d+.\d+) R: (-?\d+.\d+)$",
-            lambda payload: self.updCurrentSpeed.emit((
-            float(payload.match.group(1)), 
-            float(payload.match.group(2)))))
-        self.dispatcher.register(r"^Reset!$", lambda payload: self.reset.emit())
+            scalar('updMemUsage', 'memory', int))
+        self.dispatcher.register_parser(FieldParser(
+            r"^\[Tel\] X: (-?\d+.\d+) Y: (-?\d+.\d+) O: (-?\d+.\d+)$"),
+            lambda payload: self._sample('updTelemetry', 'pose', payload, payload.match,
+                payload.match + (payload.timestamp or datetime.now(),)))
+        self.dispatcher.register_parser(FieldParser(
+            r"^\[Speed\] L: (-?\d+.\d+) R: (-?\d+.\d+)$"),
+            lambda payload: self._sample('updCurrentSpeed', 'speed', payload, payload.match, tuple(payload.match)))
+        self.dispatcher.register(r"^Reset!$", lambda payload: self._emit(self.reset))
         self.dispatcher.register(r"^\[RC5\] Received (\d+)$",
-            lambda payload: self.rc5Input.emit(payload.match.group(1)))
+            lambda payload: self._emit(self.rc5Input, int(payload.match.group(1))))
         self.dispatcher.register(r"^\[Debug\] Radio test passed",
-            lambda payload: self.radioTxPassedTest.emit())
+            lambda payload: self._emit(self.radioTxPassedTest))
         self.dispatcher.register(r"^\[Camera\] (.+)",
-            lambda payload: self.cameraDebug.emit(payload.match.group(1)))
+            lambda payload: self._emit(self.cameraDebug, payload.match.group(1)))
 
     
\ No newline at end of file
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+
+import json
+import time
+from collections import deque
+
+class LatencyStats:
+###
+# Rolling latency percentiles per pipeline hop, over the last window
+# samples of each hop. Values are seconds measured with Monotonic.monotonic
+#   transport - link read wakeup -> line handed to IncommingMessageHandler
+#   dispatch  - MsgDispatcher.dispatch of one line
+#   queue     - batch sent -> GUI thread starts delivering it
+#   apply     - GUI slots run for one batch
+#   endToEnd  - oldest line of a batch read from link -> batch shown
+# add() may be called from any thread, report() takes a copy.
+###
+    HOPS = ('transport', 'dispatch', 'queue', 'apply', 'endToEnd')
+    PERCENTILES = (50, 95, 99)
+    
+    def __init__(self, window=4096):
+        self._samples = dict((hop, deque(maxlen=window)) for hop in self.HOPS)
+        self._counts = dict.fromkeys(self.HOPS, 0)
+        
+    def add(self, hop, seconds):
+        self._samples[hop].append(seconds)
+        self._counts[hop] += 1
+        
+    def reset(self):
+        for hop in self.HOPS:
+            self._samples[hop].clear()
+            self._counts[hop] = 0
+        
+    # {hop: {'count', 'window', 'p50', 'p95', 'p99', 'max'}}, in seconds
+    def report(self):
+        result = {}
+        for hop in self.HOPS:
+            ordered = sorted(self._samples[hop])
+            stats = {'count': self._counts[hop], 'window': len(ordered), 'max': ordered[-1] if ordered else 0.0}
+            for p in self.PERCENTILES:
+                stats['p%d' % p] = ordered[min(len(ordered)-1, len(ordered)*p // 100)] if ordered else 0.0
+            result[hop] = stats
+        return result
+        
+    def export(self, path):
+        with open(path, 'w') as f:
+            json.dump({'time': time.time(), 'hops': self.report()}, f, indent=2, sort_keys=True)
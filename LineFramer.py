@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+
+class LineFramer:
+###
+# Splits a byte stream into lines, shared by all transports
+# feed() returns complete, non empty lines, trailing partial line is kept
+#
+# Data is appended to one bytearray and only the newly arrived bytes are
+# scanned for '\n', so a long partial line is never copied or split again.
+# The complete part is copied out once and split by str.splitlines in C.
+###
+    def __init__(self):
+        self._buffer = bytearray()
+        
+    def feed(self, data):
+        buf = self._buffer
+        scan = len(buf)
+        if scan == 0: # nothing pending, split the received chunk directly
+            last = data.rfind('\n')
+            if last < 0:
+                buf += data
+                return []
+            if last + 1 < len(data):
+                buf += buffer(data, last + 1)
+            return filter(None, data[:last].splitlines())
+        buf += data
+        last = buf.rfind('\n', scan)
+        if last < 0:
+            return []
+        complete = str(buffer(buf, 0, last))
+        del buf[:last+1]
+        return filter(None, complete.splitlines())
+        
+    def pending(self):
+        return len(self._buffer)
+        
+    def reset(self):
+        del self._buffer[:]
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+from bisect import bisect_left
+
+class LineRing(object):
+###
+# Fixed size ring buffer of text lines, the model behind QRingConsole
+# Every appended line gets a sequence number, only the newest capacity
+# lines are kept. Lines are addressed by row, with a filter set rows are
+# the kept lines containing the filter text, otherwise all kept lines.
+# append() writes whole blocks with slice assignment, O(1) per line,
+# matching sequence numbers are kept in a sorted list trimmed from the front.
+###
+    def __init__(self, capacity=100000):
+        self.capacity = capacity
+        self.clear()
+
+    def clear(self):
+        self._lines = [''] * self.capacity
+        self.total = 0
+        self.filter = None
+        self._matches = []
+        self._matchStart = 0
+
+    # sequence number of the oldest kept line
+    @property
+    def first(self):
+        return max(0, self.total - self.capacity)
+
+    def __len__(self):
+        return self.total - self.first
+
+    def append(self, lines):
+        cap = self.capacity
+        if len(lines) > cap:
+            self.total += len(lines) - cap
+            lines = lines[-cap:]
+        start = self.total
+        pos = start % cap
+        end = pos + len(lines)
+        if end <= cap:
+            self._lines[pos:end] = lines
+        else:
+            split = cap - pos
+            self._lines[pos:] = lines[:split]
+            self._lines[:end-cap] = lines[split:]
+        self.total = start + len(lines)
+        if self.filter is not None:
+            text = self.filter
+            self._matches.extend([start + i for i, line in enumerate(lines) if text in line])
+            self._trim()
+
+    def _trim(self):
+        matches = self._matches
+        start = bisect_left(matches, self.first, self._matchStart)
+        if start > 4096 and start > len(matches) // 2:
+            del matches[:start]
+            start = 0
+        self._matchStart = start
+
+    def setFilter(self, text):
+        self._matches = []
+        self._matchStart = 0
+        self.filter = text or None
+        if self.filter is not None:
+            lines, cap = self._lines, self.capacity
+            self._matches = [seq for seq in xrange(self.first, self.total) if text in lines[seq % cap]]
+
+    def rows(self):
+        if self.filter is not None:
+            return len(self._matches) - self._matchStart
+        return len(self)
+
+    def seqAt(self, row):
+        if self.filter is not None:
+            return self._matches[self._matchStart + row]
+        return self.first + row
+
+    # row of the line with given sequence number, or of the next one shown
+    def rowOf(self, seq):
+        if self.filter is not None:
+            return bisect_left(self._matches, seq, self._matchStart) - self._matchStart
+        return max(0, seq - self.first)
+
+    def line(self, seq):
+        return self._lines[seq % self.capacity]
+
+    # (sequence number, line) for rows in [start, stop)
+    def rowLines(self, start, stop):
+        stop = min(stop, self.rows())
+        lines, cap = self._lines, self.capacity
+        result = []
+        for row in xrange(max(0, start), stop):
+            seq = self.seqAt(row)
+            result.append((seq, lines[seq % cap]))
+        return result
+
+    # first row from given one (inclusive) containing text, -1 if none
+    def find(self, text, row, backward=False):
+        lines, cap = self._lines, self.capacity
+        if backward:
+            rows = xrange(min(row, self.rows() - 1), -1, -1)
+        else:
+            rows = xrange(max(0, row), self.rows())
+        for r in rows:
+            if text in lines[self.seqAt(r) % cap]:
+                return r
+        return -1
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+###
+# Raw byte capture of robot links and deterministic replay
+# Usage: python LinkCapture.py info session.odincap
+###
+
+import struct
+import threading
+import time
+from datetime import datetime, timedelta
+
+from LineFramer import LineFramer
+from Monotonic import monotonic
+from Transport import MarkedMessage
+
+class LinkCapture:
+###
+# Append-only capture file of everything received and sent on the links
+# served by TransportLoop (set TransportLoop.getInstance().capture)
+# File: MAGIC, header (wall clock and monotonic time at start), records.
+# Record: RECORD header (monotonic time, kind, link id, length) and data.
+# A LINK record carrying the link name precedes the first data of a link.
+# Every Transport object gets its own id, so each reconnection is a new link.
+# Written on the loop thread, close() may be called from any thread.
+###
+    MAGIC = "ODINCAP2"
+    HEADER = struct.Struct('<dd')
+    RECORD = struct.Struct('<dBII')
+    RECEIVED, SENT, LINK = 0, 1, 2
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._links = {}
+        self._file = open(path, 'wb')
+        self._file.write(self.MAGIC + self.HEADER.pack(time.time(), monotonic()))
+        self.records = 0
+        self.bytes = 0
+
+    def received(self, link, data, t=None):
+        self._record(self.RECEIVED, link, data, t)
+
+    def sent(self, link, data, t=None):
+        self._record(self.SENT, link, data, t)
+
+    def _record(self, kind, link, data, t):
+        if t is None:
+            t = monotonic()
+        with self._lock:
+            if self._file is None:
+                return
+            linkId = self._links.get(link)
+            if linkId is None:
+                linkId = self._links[link] = len(self._links)
+                name = getattr(link, 'name', str(link))
+                self._file.write(self.RECORD.pack(t, self.LINK, linkId, len(name)) + name)
+            self._file.write(self.RECORD.pack(t, kind, linkId, len(data)))
+            self._file.write(data)
+            self.records += 1
+            self.bytes += len(data)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+class CaptureReader:
+###
+# Iterates over a capture file as (monotonic time, kind, link id, link name, data)
+###
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic = f.read(len(LinkCapture.MAGIC))
+            if magic != LinkCapture.MAGIC:
+                raise IOError("%s is not a link capture" % (path))
+            self.wallStart, self.monotonicStart = LinkCapture.HEADER.unpack(f.read(LinkCapture.HEADER.size))
+
+    # wall clock time of a record, for MarkedMessage.timestamp
+    def wallTime(self, t):
+        return datetime.fromtimestamp(self.wallStart) + timedelta(seconds=t - self.monotonicStart)
+
+    def __iter__(self):
+        record = LinkCapture.RECORD
+        names = {}
+        with open(self.path, 'rb') as f:
+            f.seek(len(LinkCapture.MAGIC) + LinkCapture.HEADER.size)
+            while True:
+                head = f.read(record.size)
+                if len(head) < record.size:
+                    return
+                t, kind, linkId, length = record.unpack(head)
+                data = f.read(length)
+                if len(data) < length: # cut short by a crash, drop the tail
+                    return
+                if kind == LinkCapture.LINK:
+                    names[linkId] = data
+                else:
+                    yield t, kind, linkId, names.get(linkId, str(linkId)), data
+
+# Feeds received bytes of a capture through LineFramer into sink.put() as
+# MarkedMessages, exactly as transports do. realtime keeps the recorded
+# pacing (scaled by speed), otherwise it runs as fast as possible.
+# links limits replay to these link names. Each link (connection) has its
+# own framer, partial lines of different connections are never joined.
+# Returns number of lines put.
+def replay(path, sink, realtime=False, speed=1.0, links=None):
+    reader = CaptureReader(path)
+    framers = {}
+    start = None
+    lines = 0
+    for t, kind, linkId, link, data in reader:
+        if kind != LinkCapture.RECEIVED or (links and link not in links):
+            continue
+        if realtime:
+            if start is None:
+                start = (t, monotonic())
+            delay = (t - start[0]) / speed - (monotonic() - start[1])
+            if delay > 0:
+                time.sleep(delay)
+        timestamp = reader.wallTime(t)
+        arrived = monotonic()
+        framer = framers.get(linkId)
+        if framer is None:
+            framer = framers[linkId] = LineFramer()
+        for line in framer.feed(data):
+            sink.put(MarkedMessage(line, timestamp, arrived))
+            lines += 1
+    return lines
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('command', choices=['info'])
+    parser.add_argument('path')
+    args = parser.parse_args()
+
+    reader = CaptureReader(args.path)
+    stats = {}
+    first = last = None
+    for t, kind, linkId, link, data in reader:
+        first = t if first is None else first
+        last = t
+        entry = stats.setdefault((link, kind), [0, 0])
+        entry[0] += 1
+        entry[1] += len(data)
+    print "Captured %s, %.1fs" % (datetime.fromtimestamp(reader.wallStart), (last - first) if first is not None else 0.0)
+    for (link, kind), (records, size) in sorted(stats.items()):
+        print "%-8s %-8s %8d chunks %10d bytes" % (link, "received" if kind == LinkCapture.RECEIVED else "sent", records, size)
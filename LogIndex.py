@@ -0,0 +1,408 @@
+#!/usr/bin/env python
+###
+# Line, time and level index of a Logger file (LogWriter output)
+# Usage: python LogIndex.py logFile.txt [--find TEXT] [--at "2016-05-01 12:00:00"]
+###
+
+import mmap
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+from TelemetryStore import toSeconds, toDatetime
+
+# first letter of a level label -> numeric level, as in Logger.LEVELS
+LEVEL_CODES = {'D': 10, 'L': 15, 'I': 20, 'W': 30, 'E': 40}
+
+class LogIndex(threading.Thread):
+###
+# Indexes a log file in the background: offset, time and level of every line
+# Lines look like "2016-05-01 12:00:00.123456 INFO : message", other lines
+# (multi-line messages) take time and level of the line before.
+# The file is memory-mapped and scanned in CHUNK byte blocks, newlines and
+# the fixed-width timestamp/level fields are found with NumPy, no Python
+# code runs per line. Index arrays grow by doubling, readers take views of
+# the indexed part (snapshot()) without locking the scan.
+# The index is cached in <path>.idx.npz and reused when the file still
+# starts with the same bytes, only appended data is scanned.
+# With follow set the file is checked for new lines every follow seconds.
+###
+    CHUNK = 16*1024*1024
+    HEAD = 64
+    FIELDS = 32
+
+    def __init__(self, path, follow=0.0, cache=True):
+        super(LogIndex, self).__init__(name="LogIndex")
+        self.daemon = True
+        self.path = path
+        self.follow = follow
+        self.cachePath = path + ".idx.npz" if cache else None
+        self.fromCache = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._starts = np.empty(1024, 'i8')
+        self._times = np.empty(1024, 'f8')
+        self._levels = np.empty(1024, 'u1')
+        self._count = 0
+        self._scanned = 0
+        self._head = ''
+        self._size = 0
+        self._table = np.zeros(256, 'u1')
+        for letter, level in LEVEL_CODES.iteritems():
+            self._table[ord(letter)] = level
+        if self.cachePath is not None:
+            self._load()
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        if self.isAlive():
+            self.join(timeout)
+
+    # share of the file indexed so far, 0.0 - 1.0
+    def progress(self):
+        return float(self._scanned) / self._size if self._size else 1.0
+
+    def done(self):
+        return self._scanned >= self._size
+
+    # (line starts, times, levels, end of the last indexed line), views
+    def snapshot(self):
+        with self._lock:
+            count = self._count
+            return self._starts[:count], self._times[:count], self._levels[:count], self._scanned
+
+    def __len__(self):
+        return self._count
+
+    # first line at or after timestamp (datetime or seconds since 1970)
+    def lineAt(self, timestamp):
+        starts, times, levels, end = self.snapshot()
+        return int(times.searchsorted(toSeconds(timestamp), 'left'))
+
+    # a followed file is cached after the first pass and on stop only
+    def run(self):
+        unsaved = 0
+        first = True
+        while not self._stopped.isSet():
+            unsaved += self._scan()
+            if unsaved and first:
+                self._save()
+                unsaved = 0
+            first = False
+            if not self.follow or self._stopped.wait(self.follow):
+                break
+        if unsaved:
+            self._save()
+
+    def _scan(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return 0
+        self._size = size
+        with open(self.path, 'rb') as f:
+            head = f.read(self.HEAD)
+        if size < self._scanned or head[:len(self._head)] != self._head:
+            self._reset() # rotated or replaced
+        self._head = head
+        if size <= self._scanned:
+            return 0
+        with open(self.path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        added = 0
+        try:
+            position = self._scanned
+            chunk = self.CHUNK
+            while position < size and not self._stopped.isSet():
+                end = min(size, position + chunk)
+                lines, scanned = self._indexChunk(mapped, position, end)
+                if scanned == position: # no complete line in the block
+                    if end == size:
+                        break
+                    chunk *= 2
+                    continue
+                added += lines
+                position = scanned
+                chunk = self.CHUNK
+        finally:
+            mapped.close()
+        return added
+
+    def _indexChunk(self, mapped, position, end):
+        data = np.frombuffer(mapped, 'u1', end - position, position)
+        newlines = np.flatnonzero(data == 10)
+        if not len(newlines):
+            return 0, position
+        starts = np.empty(len(newlines), 'i8')
+        starts[0] = 0
+        starts[1:] = newlines[:-1] + 1
+        fields = data[np.minimum(starts[:, None] + np.arange(self.FIELDS), len(data) - 1)]
+        digits = fields.astype('i4') - 48
+
+        valid = (fields[:, 4] == 45) & (fields[:, 7] == 45) & (fields[:, 10] == 32) & \
+            (fields[:, 13] == 58) & (fields[:, 16] == 58)
+        year = digits[:, 0]*1000 + digits[:, 1]*100 + digits[:, 2]*10 + digits[:, 3]
+        month = digits[:, 5]*10 + digits[:, 6]
+        day = digits[:, 8]*10 + digits[:, 9]
+        seconds = (digits[:, 11]*10 + digits[:, 12])*3600 + (digits[:, 14]*10 + digits[:, 15])*60 + \
+            digits[:, 17]*10 + digits[:, 18]
+        fraction = fields[:, 19] == 46
+        micro = digits[:, 20:26].dot(np.array([100000, 10000, 1000, 100, 10, 1], 'i4'))
+        # days since 1970-01-01 of a proleptic Gregorian date (days_from_civil)
+        y = year - (month <= 2)
+        era = y // 400
+        yoe = y - era*400
+        doy = (153*(month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+        days = era*146097 + yoe*365 + yoe//4 - yoe//100 + doy - 719468
+        times = days*86400.0 + seconds + np.where(fraction, micro, 0) / 1e6
+        levels = self._table[np.where(fraction, fields[:, 27], fields[:, 20])]
+
+        # lines without a timestamp inherit from the line before
+        if not valid.all():
+            if not valid[0]:
+                times[0], levels[0] = self._last()
+                valid[0] = True
+            source = np.maximum.accumulate(np.where(valid, np.arange(len(valid)), 0))
+            times = times[source]
+            levels = levels[source]
+        self._append(starts + position, times, levels, position + newlines[-1] + 1)
+        return len(starts), position + newlines[-1] + 1
+
+    def _last(self):
+        if self._count:
+            return self._times[self._count-1], self._levels[self._count-1]
+        return 0.0, 0
+
+    def _append(self, starts, times, levels, scanned):
+        count = self._count
+        new = count + len(starts)
+        if new > len(self._starts):
+            capacity = max(new, 2*len(self._starts))
+            grown = []
+            for array in (self._starts, self._times, self._levels):
+                bigger = np.empty(capacity, array.dtype)
+                bigger[:count] = array[:count]
+                grown.append(bigger)
+            with self._lock:
+                self._starts, self._times, self._levels = grown
+        self._starts[count:new] = starts
+        self._times[count:new] = times
+        self._levels[count:new] = levels
+        with self._lock:
+            self._count = new
+            self._scanned = scanned
+
+    def _reset(self):
+        with self._lock:
+            self._count = 0
+            self._scanned = 0
+        self._head = ''
+
+    def _load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                head = f.read(self.HEAD)
+            cached = np.load(self.cachePath)
+            try:
+                indexedHead = cached['head'].tostring()
+                scanned = int(cached['scanned'])
+                if head[:len(indexedHead)] != indexedHead or os.path.getsize(self.path) < scanned:
+                    return
+                self._append(cached['starts'], cached['times'], cached['levels'], scanned)
+            finally:
+                cached.close()
+            self._head = indexedHead
+            self.fromCache = self._count
+        except (IOError, OSError, KeyError, ValueError):
+            self._reset()
+
+    def _save(self):
+        if self.cachePath is None:
+            return
+        starts, times, levels, scanned = self.snapshot()
+        temporary = self.cachePath + ".tmp.npz"
+        try:
+            np.savez(temporary, starts=starts, times=times, levels=levels, scanned=scanned,
+                head=np.frombuffer(self._head, 'u1'))
+            if os.path.exists(self.cachePath):
+                os.remove(self.cachePath)
+            os.rename(temporary, self.cachePath)
+        except (IOError, OSError):
+            pass
+
+class LogModel(object):
+###
+# Rows of an indexed log file for QRingConsole, same row interface as
+# LineRing. Rows are lines at or above minLevel containing the filter text.
+# The indexed part of the file is memory-mapped only for the duration of
+# one call (text filter and find use mmap.find, C speed over the whole
+# file), no handle stays open, so LogWriter can still rotate a followed
+# file on Windows.
+###
+    first = 0
+
+    def __init__(self, index):
+        self.index = index
+        self.filter = None
+        self.minLevel = 0
+        self._mapped = 0
+        self._selected = None
+        self._selectedUpTo = 0
+        self.update()
+
+    # picks up lines indexed since last call, returns number of rows
+    # a rotated (restarted) file is shown from scratch
+    def update(self):
+        self._starts, self._times, self._levels, self._mapped = self.index.snapshot()
+        if self._selected is not None and self._selectedUpTo > len(self._starts):
+            self._reselect()
+        elif self._selected is not None and self._selectedUpTo < len(self._starts):
+            self._selected = np.concatenate((self._selected, self._select(self._selectedUpTo, len(self._starts))))
+            self._selectedUpTo = len(self._starts)
+        return self.rows()
+
+    # memory map of the indexed part, None when the file is shorter (rotated
+    # and not yet picked up by update())
+    @contextmanager
+    def _mapping(self):
+        mapped = None
+        try:
+            with open(self.index.path, 'rb') as f:
+                if self._mapped and os.fstat(f.fileno()).st_size >= self._mapped:
+                    mapped = mmap.mmap(f.fileno(), self._mapped, access=mmap.ACCESS_READ)
+        except (IOError, OSError):
+            pass
+        try:
+            yield mapped
+        finally:
+            if mapped is not None:
+                mapped.close()
+
+    def setLevel(self, level):
+        self.minLevel = level
+        self._reselect()
+
+    def setFilter(self, text):
+        self.filter = self._bytes(text) or None
+        self._reselect()
+
+    # the file is searched as bytes
+    def _bytes(self, text):
+        if isinstance(text, unicode):
+            return text.encode('utf-8')
+        return text
+
+    def _reselect(self):
+        if self.filter is None and not self.minLevel:
+            self._selected = None
+        else:
+            self._selected = self._select(0, len(self._starts))
+            self._selectedUpTo = len(self._starts)
+
+    # line numbers in [lo, hi) passing level and text filter
+    def _select(self, lo, hi):
+        if self.minLevel:
+            candidates = lo + np.flatnonzero(self._levels[lo:hi] >= self.minLevel)
+        else:
+            candidates = np.arange(lo, hi)
+        if self.filter is None or not len(candidates):
+            return candidates
+        matching = []
+        position = int(self._starts[lo])
+        end = self._offset(hi)
+        with self._mapping() as mapped:
+            while mapped is not None:
+                position = mapped.find(self.filter, position, end)
+                if position < 0:
+                    break
+                line = int(self._starts.searchsorted(position, 'right')) - 1
+                matching.append(line)
+                position = self._offset(line + 1)
+        matching = np.array(matching, 'i8')
+        if self.minLevel:
+            matching = matching[self._levels[matching] >= self.minLevel]
+        return matching
+
+    def _offset(self, line):
+        return int(self._starts[line]) if line < len(self._starts) else self._mapped
+
+    def rows(self):
+        return len(self._selected) if self._selected is not None else len(self._starts)
+
+    def seqAt(self, row):
+        return int(self._selected[row]) if self._selected is not None else row
+
+    def rowOf(self, seq):
+        if self._selected is not None:
+            return int(self._selected.searchsorted(seq, 'left'))
+        return max(0, seq)
+
+    def line(self, seq):
+        with self._mapping() as mapped:
+            return self._line(mapped, seq)
+
+    def _line(self, mapped, seq):
+        if mapped is None:
+            return ''
+        return mapped[int(self._starts[seq]):self._offset(seq + 1)].rstrip('\r\n')
+
+    def rowLines(self, start, stop):
+        stop = min(stop, self.rows())
+        with self._mapping() as mapped:
+            return [(self.seqAt(row), self._line(mapped, self.seqAt(row))) for row in xrange(max(0, start), stop)]
+
+    def timeOf(self, seq):
+        return toDatetime(self._times[seq])
+
+    # row of the first shown line at or after timestamp
+    def rowAt(self, timestamp):
+        return self.rowOf(int(self._times.searchsorted(toSeconds(timestamp), 'left')))
+
+    def find(self, text, row, backward=False):
+        text = self._bytes(text)
+        rows = self.rows()
+        with self._mapping() as mapped:
+            while mapped is not None and 0 <= row < rows:
+                seq = self.seqAt(row)
+                if backward:
+                    position = mapped.rfind(text, 0, self._offset(seq + 1))
+                else:
+                    position = mapped.find(text, int(self._starts[seq]), self._mapped)
+                if position < 0:
+                    return -1
+                line = int(self._starts.searchsorted(position, 'right')) - 1
+                found = self.rowOf(line)
+                if found < rows and self.seqAt(found) == line:
+                    return found
+                row = found - 1 if backward else found
+        return -1
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('path')
+    parser.add_argument('--find', default=None, help="print lines containing this text")
+    parser.add_argument('--at', default=None, help="print lines from this time, YYYY-MM-DD HH:MM:SS")
+    parser.add_argument('--level', default=None, choices=sorted(LEVEL_CODES.values()), type=int)
+    parser.add_argument('--lines', type=int, default=20)
+    args = parser.parse_args()
+
+    index = LogIndex(args.path)
+    start = time.time()
+    index.run()
+    print "%d lines, %d from cache, indexed in %.2fs" % (len(index), index.fromCache, time.time() - start)
+    model = LogModel(index)
+    if args.level:
+        model.setLevel(args.level)
+    row = 0
+    if args.at:
+        row = model.rowAt(datetime.strptime(args.at, "%Y-%m-%d %H:%M:%S"))
+    if args.find:
+        row = model.find(args.find, row)
+    if row >= 0:
+        for seq, line in model.rowLines(row, row + args.lines):
+            print line
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+from PyQt4 import QtCore, QtGui
+from PyQt4.QtCore import Qt
+
+from LogIndex import LogIndex, LogModel
+from QRingConsole import QRingConsole, toUnicode
+
+class LogViewer(QtGui.QWidget):
+###
+# Window browsing a log file (logFile.txt or its rotated copies)
+# The file is indexed by LogIndex in the background and shown in a
+# QRingConsole through LogModel, lines appear as soon as they are indexed.
+# Open file keeps being followed, new lines are picked up every POLL_MS.
+###
+    POLL_MS = 200
+    FOLLOW_S = 1.0
+    LEVELS = [("All levels", 0), ("Debug", 10), ("Log", 15), ("Info", 20), ("Warn", 30), ("Error", 40)]
+
+    def __init__(self, path=None, parent=None):
+        super(LogViewer, self).__init__(parent)
+        self.index = None
+        self.model = None
+        self.timeSet = False
+        self.setWindowTitle("Log viewer")
+        self.resize(900, 600)
+        self.setupGUI()
+
+        self.pollTimer = QtCore.QTimer(self)
+        self.pollTimer.timeout.connect(self.poll)
+        if path is not None:
+            self.open(path)
+
+    def open(self, path):
+        self.closeIndex()
+        self.index = LogIndex(str(path), self.FOLLOW_S)
+        self.index.start()
+        self.model = LogModel(self.index)
+        self.model.setLevel(self.LEVELS[self.levelCombo.currentIndex()][1])
+        self.model.setFilter(toUnicode(self.filterInput.text()))
+        self.console.setModel(self.model)
+        self.timeSet = False
+        self.setWindowTitle("Log viewer - " + str(path))
+        self.pollTimer.start(self.POLL_MS)
+        self.poll()
+
+    def closeIndex(self):
+        self.pollTimer.stop()
+        if self.index is not None:
+            self.index.stop(1.0)
+            self.index = self.model = None
+
+    @QtCore.pyqtSlot()
+    def poll(self):
+        rows = self.model.rows()
+        if self.model.update() != rows:
+            self.console.scheduleRefresh()
+        if not self.timeSet and len(self.index):
+            self.timeEdit.setDateTime(self.model.timeOf(0))
+            self.timeSet = True
+        status = "%d lines" % (len(self.index))
+        if not self.index.done():
+            status += ", indexing %.0f%%" % (self.index.progress() * 100)
+        if self.index.fromCache:
+            status += ", %d from cache" % (self.index.fromCache)
+        self.statusLabel.setText(status)
+
+    @QtCore.pyqtSlot()
+    def openRequested(self):
+        path = QtGui.QFileDialog.getOpenFileName(self, "Open log file", "", "Log files (*.txt *.txt.[0-9] *.txt.[0-9][0-9]);;All files (*)")
+        if path:
+            self.open(path)
+
+    @QtCore.pyqtSlot(int)
+    def setLevel(self, index):
+        if self.model is not None:
+            self.model.setLevel(self.LEVELS[index][1])
+            self.console.scheduleRefresh()
+
+    @QtCore.pyqtSlot()
+    def goToTime(self):
+        if self.model is not None and self.model.rows():
+            row = self.model.rowAt(self.timeEdit.dateTime().toPyDateTime())
+            self.console.select(min(row, self.model.rows() - 1))
+
+    def closeEvent(self, event):
+        self.closeIndex()
+        super(LogViewer, self).closeEvent(event)
+
+    def setupGUI(self):
+        self.openBtn = QtGui.QPushButton("Open...")
+        self.openBtn.clicked.connect(self.openRequested)
+        self.levelCombo = QtGui.QComboBox()
+        self.levelCombo.addItems([name for name, _ in self.LEVELS])
+        self.levelCombo.setStatusTip("Show only messages of this level or higher")
+        self.levelCombo.currentIndexChanged.connect(self.setLevel)
+        self.filterInput = QtGui.QLineEdit()
+        self.filterInput.setPlaceholderText("Filter")
+        self.timeEdit = QtGui.QDateTimeEdit()
+        self.timeEdit.setDisplayFormat("yyyy-MM-dd HH:mm:ss")
+        self.goBtn = QtGui.QPushButton("Go")
+        self.goBtn.setMaximumWidth(40)
+        self.goBtn.clicked.connect(self.goToTime)
+        self.findInput = QtGui.QLineEdit()
+        self.findInput.setPlaceholderText("Find")
+        self.findPrevBtn = QtGui.QPushButton("<")
+        self.findPrevBtn.setMaximumWidth(30)
+        self.findNextBtn = QtGui.QPushButton(">")
+        self.findNextBtn.setMaximumWidth(30)
+        self.statusLabel = QtGui.QLabel()
+
+        self.console = QRingConsole()
+        self.console.setSizePolicy(QtGui.QSizePolicy.Expanding, QtGui.QSizePolicy.Expanding)
+        self.filterInput.returnPressed.connect(lambda: self.console.setFilter(self.filterInput.text()))
+        self.findInput.returnPressed.connect(lambda: self.console.find(self.findInput.text()))
+        self.findPrevBtn.clicked.connect(lambda: self.console.find(self.findInput.text(), True))
+        self.findNextBtn.clicked.connect(lambda: self.console.find(self.findInput.text()))
+
+        tools = QtGui.QHBoxLayout()
+        tools.addWidget(self.openBtn)
+        tools.addWidget(self.levelCombo)
+        tools.addWidget(self.filterInput)
+        tools.addWidget(self.timeEdit)
+        tools.addWidget(self.goBtn)
+        tools.addWidget(self.findInput)
+        tools.addWidget(self.findPrevBtn)
+        tools.addWidget(self.findNextBtn)
+
+        layout = QtGui.QVBoxLayout()
+        layout.addLayout(tools)
+        layout.addWidget(self.console)
+        layout.addWidget(self.statusLabel, 0, Qt.AlignRight)
+        self.setLayout(layout)
+
+if __name__ == '__main__':
+    import sys
+    app = QtGui.QApplication(sys.argv)
+    viewer = LogViewer(sys.argv[1] if len(sys.argv) > 1 else "logFile.txt")
+    viewer.show()
+    sys.exit(app.exec_())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+import os
+import threading
+import time
+from collections import deque
+
+from Logger import Logger
+
+class LogWriter(threading.Thread):
+###
+# Writes log lines to a file on its own thread
+# write() only appends to a deque (atomic, no lock), callable from any
+# thread. Every flushInterval seconds the writer takes all pending lines,
+# writes them as one block and flushes the file.
+# The file is rotated when it grows over maxBytes or is older than
+# rotateInterval seconds (0 disables either): path -> path.1 -> path.2 ...,
+# keeping at most backups old files. A failed rotation (e.g. the file is
+# open elsewhere on Windows) is reported and retried after ROTATE_RETRY
+# seconds, writing goes on to the current file meanwhile. Lines that
+# cannot be written go back to the front of the deque and are retried on
+# the next flush, a failure is reported once until a write succeeds again.
+# The owner calls start().
+###
+    ROTATE_RETRY = 60.0
+
+    def __init__(self, path, flushInterval=0.2, maxBytes=10*1024*1024, rotateInterval=0, backups=5):
+        super(LogWriter, self).__init__(name="LogWriter")
+        self.daemon = True
+        self.path = path
+        self.flushInterval = flushInterval
+        self.maxBytes = maxBytes
+        self.rotateInterval = rotateInterval
+        self.backups = backups
+        self.written = 0
+        self.failures = 0
+        self._rotateAfter = 0.0
+        self._failing = False
+        self.batches = 0
+        self._pending = deque()
+        self._stopped = threading.Event()
+        self._open()
+        
+    def write(self, line):
+        self._pending.append(line)
+        
+    def stop(self, timeout=None):
+        self._stopped.set()
+        self.join(timeout)
+        
+    def run(self):
+        while not self._stopped.wait(self.flushInterval):
+            self._guarded(self._drain)
+        self._guarded(self._drain)
+        self._file.close()
+        
+    # the thread must survive anything, or lines pile up in the deque forever
+    def _guarded(self, function):
+        try:
+            function()
+        except Exception as e:
+            self.failures += 1
+            Logger.getInstance().error("Log writer failed: " + str(e))
+        
+    def _drain(self):
+        pending = self._pending
+        lines = []
+        try:
+            while True:
+                lines.append(pending.popleft())
+        except IndexError:
+            pass
+        if not lines:
+            return
+        try:
+            self._file.write('\n'.join(lines) + '\n')
+            self._file.flush()
+        except (IOError, OSError) as e:
+            pending.extendleft(reversed(lines))
+            self.failures += 1
+            if not self._failing:
+                self._failing = True
+                Logger.getInstance().error("Log writer cannot write %s, keeping lines: %s", self.path, e)
+            return
+        self._failing = False
+        self.written += len(lines)
+        self.batches += 1
+        if time.time() >= self._rotateAfter and ((self.maxBytes and self._file.tell() >= self.maxBytes) or \
+                (self.rotateInterval and time.time() - self._opened >= self.rotateInterval)):
+            self._rotate()
+            
+    def _open(self):
+        self._file = open(self.path, 'a')
+        self._opened = time.time()
+        
+    def _rotate(self):
+        self._file.close()
+        try:
+            # rename does not replace an existing file on Windows
+            oldest = "%s.%d" % (self.path, self.backups)
+            if self.backups > 0 and os.path.exists(oldest):
+                os.remove(oldest)
+            for i in xrange(self.backups - 1, 0, -1):
+                older = "%s.%d" % (self.path, i)
+                if os.path.exists(older):
+                    os.rename(older, "%s.%d" % (self.path, i + 1))
+            if self.backups > 0:
+                os.rename(self.path, self.path + ".1")
+            else:
+                os.remove(self.path)
+        except OSError:
+            self._rotateAfter = time.time() + self.ROTATE_RETRY
+            raise
+        finally:
+            self._open()
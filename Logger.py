@@ -1,50 +1,126 @@
 #!/usr/bin/env python
 
 from PyQt4 import QtCore
-from PyQt4.QtCore import QMutex, QMutexLocker
 from datetime import datetime
 
+# numeric thresholds, the logging methods compare them inline
+DEBUG_LEVEL, LOG_LEVEL, INFO_LEVEL, WARN_LEVEL, ERROR_LEVEL = 10, 15, 20, 30, 40
+
 class Logger(QtCore.QObject):
     """
     Implement Pattern: SINGLETON
+    Formatted lines are emitted as update (queued to GUI) and passed
+    directly, in the logging thread, to every sink, e.g. LogWriter.write
+    Sinks must be thread safe and must not block
+
+    Messages are templates formatted with args only when someone will get
+    them: debug("X: %.5f", x, source="camera")
+    A message passes when its level is at least the threshold of its source
+    (setLevel for the default, setSourceLevel per source) and reaches the
+    sinks/console whose own threshold it meets. Anything nobody can get is
+    dropped after one comparison with a precomputed floor.
     """
     update = QtCore.pyqtSignal(str)
-    
-    __lockObj = QMutex()
+
     LOG, DEBUG, INFO, WARN, ERROR = ("LOG  ", "DEBUG", "INFO ", "WARN ", "ERROR")
+    LEVELS = {DEBUG: DEBUG_LEVEL, LOG: LOG_LEVEL, INFO: INFO_LEVEL, WARN: WARN_LEVEL, ERROR: ERROR_LEVEL}
 
     def __init__(self):
         super(Logger, self).__init__()
-    
+        self._sinks = ()
+        self._level = Logger.LEVELS[Logger.DEBUG]
+        self._sourceLevels = {}
+        self._consoleLevel = Logger.LEVELS[Logger.DEBUG]
+        self._updateFloor()
+
     def __call__(self):
         return self
-        
+
     def getInstance(self):
         return self
-        
-    @QtCore.pyqtSlot(str,str)    
-    def put(self, type, message):
-        with QMutexLocker(Logger.__lockObj):
-            Logger.update.emit(str(datetime.now()) + " " + type + ": " + str(message))
-            
-    @QtCore.pyqtSlot(str)    
-    def debug(self, message):
-        self.put(Logger.DEBUG, message)      
-    @QtCore.pyqtSlot(str)    
-    def log(self, message):
-        self.put(Logger.LOG, message)
-    @QtCore.pyqtSlot(str)    
-    def info(self, message):
-        self.put(Logger.INFO, message)
-    @QtCore.pyqtSlot(str)    
-    def warn(self, message):
-        self.put(Logger.WARN, message)        
-    @QtCore.pyqtSlot(str)    
-    def error(self, message):
-        self.put(Logger.ERROR, message)      
-           
+
+    # sink list is replaced, never modified, so put() needs no lock
+    def addSink(self, sink, level=DEBUG):
+        self._sinks = self._sinks + ((sink, Logger.LEVELS[level]),)
+        self._updateFloor()
+
+    def removeSink(self, sink):
+        self._sinks = tuple((s, l) for s, l in self._sinks if s != sink)
+        self._updateFloor()
+
+    def setLevel(self, level):
+        self._level = Logger.LEVELS[level]
+        self._updateFloor()
+
+    # level None returns the source to the default threshold
+    def setSourceLevel(self, source, level):
+        levels = dict(self._sourceLevels)
+        if level is None:
+            levels.pop(source, None)
+        else:
+            levels[source] = Logger.LEVELS[level]
+        self._sourceLevels = levels
+        self._updateFloor()
+
+    def setConsoleLevel(self, level):
+        self._consoleLevel = Logger.LEVELS[level]
+        self._updateFloor()
+
+    def isEnabledFor(self, level, source=None):
+        value = Logger.LEVELS[level]
+        return value >= self._floor and value >= self._sourceLevels.get(source, self._level)
+
+    def _updateFloor(self):
+        sourceMin = min([self._level] + self._sourceLevels.values())
+        sinkMin = min([self._consoleLevel] + [level for _, level in self._sinks])
+        self._floor = max(sourceMin, sinkMin)
+
+    # thresholds of the source are checked by the caller (debug(), info(), ...)
+    @QtCore.pyqtSlot(str,str)
+    def put(self, type, message, args=(), source=None):
+        level = Logger.LEVELS[type]
+        if args:
+            message = message % args
+        line = str(datetime.now()) + " " + type + ": " + str(message)
+        for sink, sinkLevel in self._sinks:
+            if level >= sinkLevel:
+                sink(line)
+        if level >= self._consoleLevel:
+            self.update.emit(line)
+
+    @QtCore.pyqtSlot(str)
+    def debug(self, message, *args, **kwargs):
+        if self._floor <= DEBUG_LEVEL:
+            source = kwargs.get('source')
+            if self._sourceLevels.get(source, self._level) <= DEBUG_LEVEL:
+                self.put(Logger.DEBUG, message, args, source)
+    @QtCore.pyqtSlot(str)
+    def log(self, message, *args, **kwargs):
+        if self._floor <= LOG_LEVEL:
+            source = kwargs.get('source')
+            if self._sourceLevels.get(source, self._level) <= LOG_LEVEL:
+                self.put(Logger.LOG, message, args, source)
+    @QtCore.pyqtSlot(str)
+    def info(self, message, *args, **kwargs):
+        if self._floor <= INFO_LEVEL:
+            source = kwargs.get('source')
+            if self._sourceLevels.get(source, self._level) <= INFO_LEVEL:
+                self.put(Logger.INFO, message, args, source)
+    @QtCore.pyqtSlot(str)
+    def warn(self, message, *args, **kwargs):
+        if self._floor <= WARN_LEVEL:
+            source = kwargs.get('source')
+            if self._sourceLevels.get(source, self._level) <= WARN_LEVEL:
+                self.put(Logger.WARN, message, args, source)
+    @QtCore.pyqtSlot(str)
+    def error(self, message, *args, **kwargs):
+        if self._floor <= ERROR_LEVEL:
+            source = kwargs.get('source')
+            if self._sourceLevels.get(source, self._level) <= ERROR_LEVEL:
+                self.put(Logger.ERROR, message, args, source)
+
 """
 Overwrite class definition to prevent creation of new objects
 SINGLETON
-"""           
-Logger = Logger()
\ No newline at end of file
+"""
+Logger = Logger()
@@ -2,6 +2,7 @@
 
 from PyQt4 import QtCore, QtGui
 from PyQt4.QtCore import Qt
+from datetime import datetime
 
 from LeftPanel import LeftPanel
 from Logger import Logger
@@ -10,7 +11,15 @@ from TrajectoryTab import TrajectoryTab
 from TelemetryTab import TelemetryTab
 from CameraTab import CameraTab
 from MotorsTab import MotorsTab
+from DiagnosticsTab import DiagnosticsTab
 from QHistoryLineEdit import QHistoryLineEdit
+from QRingConsole import QRingConsole
+from OutgoingScheduler import OutgoingScheduler
+from TelemetryStore import TelemetryStore
+from LinkCapture import LinkCapture
+from LogWriter import LogWriter
+from LogViewer import LogViewer
+from Transport import TransportLoop
 
 # Shortcuts
 # Ctrl+Shift+C - Connect button click
@@ -21,13 +30,17 @@ from QHistoryLineEdit import QHistoryLineEdit
 # Alt+R - Trajectory tba
 # Alt+S - SD card tab
 # Alt+C - Camera tab
+# Alt+D - Diagnostics tab
 
 class MainWindow(QtGui.QMainWindow):
-    def __init__(self, incomming_queue, outgoing_queue):
+    # incomming results are delivered to the GUI once per this period, 0 for every message
+    DISPATCH_BATCH_S = 0.016
+    
+    def __init__(self, outgoing_queue):
         super(MainWindow, self).__init__()
 
-        self.incomming_queue = incomming_queue
         self.outgoing_queue = outgoing_queue
+        self.telemetryStore = TelemetryStore()
         
         self.setUpGUI()     
         self.createActions()
@@ -40,19 +53,28 @@ class MainWindow(QtGui.QMainWindow):
         self.setMinimumSize(800,600)
         self.resize(1024,800)
         
-        self.logFileHandle = open('logFile.txt', 'a')
+        self.logWriter = LogWriter('logFile.txt')
+        self.logWriter.start()
+        self.logViewer = None
+        Logger.getInstance().addSink(self.logWriter.write)
+        # per frame camera poses (up to 188 fps) only on request, see File menu
+        Logger.getInstance().setSourceLevel("camera", Logger.INFO)
         Logger.getInstance().update.connect(self.logConsole.appendPlainText)
-        Logger.getInstance().update.connect(lambda s: self.logFileHandle.write(s+'\n'))
         Logger.getInstance().info("Main window is up")
         
         self.connectDone(False)
         
-        self.dispatcher = IncommingMessageHandler(self.incomming_queue)
+        self.dispatcher = IncommingMessageHandler(self.DISPATCH_BATCH_S, self.telemetryStore)
         self.dispatcherThread = QtCore.QThread()
         self.dispatcher.moveToThread(self.dispatcherThread)
-        self.dispatcherThread.started.connect(self.dispatcher.loop)
+        self.dispatcherThread.started.connect(self.dispatcher.start)
         self.dispatcherThread.start()
+        self.diagnosticsPanel.setDispatcher(self.dispatcher.dispatcher)
+        self.diagnosticsPanel.setLatency(self.dispatcher.latency)
+        self.cameraPanel.setTelemetryStore(self.telemetryStore)
+        self.telemetryPanel.setTelemetryStore(self.telemetryStore)
         
+        self.dispatcher.batch.connect(self.deliverBatch)
         self.dispatcher.incomming.connect(self.commConsole.appendPlainText)
         self.dispatcher.updBatteryVoltage.connect(self.leftPanel.batteryBar.setValue)
         self.dispatcher.updCpuUsage.connect(self.leftPanel.cpuUsageBar.setValue)
@@ -64,16 +86,29 @@ class MainWindow(QtGui.QMainWindow):
         self.dispatcher.radioTxPassedTest.connect(self.cameraPanel.radioTestRxPassed)
         self.dispatcher.cameraDebug.connect(self.cameraPanel.radioDebugCommHandler)
         
+    @QtCore.pyqtSlot(object)
+    def deliverBatch(self, batch):
+        self.dispatcher.deliver(batch)
+        
     def about(self):
         QtGui.QMessageBox.about(self, "About Menu",
                 "The <b>Menu</b> example shows how to create menu-bar menus "
                 "and context menus.")
 
     def closeEvent(self, event):
-        self.logFileHandle.close()
         self.dispatcher.stop()
+        stats = self.dispatcher.conflationStats()
+        Logger.getInstance().info("Conflated %d state samples (%s), %d deliveries deferred, %d batches lost" % (stats.pop('total'), 
+            ", ".join("%s: %d" % (name, count) for name, count in sorted(stats.items()) if name not in ('deferred', 'lost')),
+            stats['deferred'], stats['lost']))
         self.dispatcherThread.quit()
         self.dispatcherThread.wait()
+        self.telemetryStore.close()
+        self.captureLinks(False)
+        if self.logViewer is not None:
+            self.logViewer.close()
+        Logger.getInstance().removeSink(self.logWriter.write)
+        self.logWriter.stop(1.0)
         QtGui.qApp.quit()
         event.ignore()
         #exit()
@@ -118,20 +153,67 @@ class MainWindow(QtGui.QMainWindow):
         self.cameraPanel.resetDefault()
         self.motorsPanel.resetDefault()
         
-    def sendComm(self, msg_list):
+    def sendComm(self, msg_list, lane=OutgoingScheduler.MANUAL):
         if self.connected:
             if not isinstance(msg_list, list):
                 msg_list = [msg_list]
             for msg in msg_list:
                 if not isinstance(msg, str):
                     msg = str(msg)
-                self.outgoing_queue.put(msg + "\n", True)
+                self.outgoing_queue.put((lane, msg + "\n"), True)
                 self.commConsole.appendPlainText(msg)            
         
     def connectRequested(self):
         return self.leftPanel.connectRequested
         
+    @QtCore.pyqtSlot()
+    def exportTelemetry(self):
+        directory = QtGui.QFileDialog.getExistingDirectory(self, "Export telemetry to")
+        if directory:
+            paths = self.telemetryStore.exportCsv(str(directory))
+            Logger.getInstance().info("Telemetry exported to " + (", ".join(paths) or "nothing, no samples yet"))
+        
+    @QtCore.pyqtSlot(bool)
+    def captureLinks(self, enable):
+        loop = TransportLoop.getInstance()
+        if enable and loop.capture is None:
+            path = QtGui.QFileDialog.getSaveFileName(self, "Capture link traffic to", 
+                datetime.now().strftime("capture-%Y%m%d-%H%M%S.odincap"), "Link capture (*.odincap)")
+            if not path:
+                self.captureAct.setChecked(False)
+                return
+            loop.capture = LinkCapture(str(path))
+            Logger.getInstance().info("Capturing link traffic to " + str(path))
+        elif not enable and loop.capture is not None:
+            capture, loop.capture = loop.capture, None
+            # synchronous, the loop thread is a daemon and would not finish a posted close on exit
+            capture.close()
+            Logger.getInstance().info("Link capture %s closed, %d bytes in %d records" % (capture.path, capture.bytes, capture.records))
+        
+    @QtCore.pyqtSlot()
+    def showLogViewer(self):
+        if self.logViewer is None:
+            self.logViewer = LogViewer(self.logWriter.path)
+        self.logViewer.show()
+        self.logViewer.raise_()
+        
+    @QtCore.pyqtSlot(bool)
+    def cameraDebugLog(self, enable):
+        Logger.getInstance().setSourceLevel("camera", Logger.DEBUG if enable else Logger.INFO)
+        
     def createActions(self):
+        self.exportTelemetryAct = QtGui.QAction("&Export telemetry...", self, shortcut="Ctrl+E",
+                statusTip="Save telemetry history of this session as CSV files",
+                triggered=self.exportTelemetry)
+        self.captureAct = QtGui.QAction("&Capture link traffic...", self, checkable=True,
+                statusTip="Record all bytes sent and received on robot links for replay",
+                toggled=self.captureLinks)
+        self.logViewerAct = QtGui.QAction("&Log viewer...", self, shortcut="Ctrl+L",
+                statusTip="Browse, filter and search the log file",
+                triggered=self.showLogViewer)
+        self.cameraDebugAct = QtGui.QAction("Camera &debug log", self, checkable=True,
+                statusTip="Log every camera pose (per frame)",
+                toggled=self.cameraDebugLog)
         self.exitAct = QtGui.QAction("E&xit", self, shortcut="Ctrl+Q",
                 statusTip="Exit the application", triggered=self.close)
         self.aboutAct = QtGui.QAction("&About", self,
@@ -143,6 +225,10 @@ class MainWindow(QtGui.QMainWindow):
                 
     def createMenus(self):
         self.fileMenu = self.menuBar().addMenu("&File")
+        self.fileMenu.addAction(self.exportTelemetryAct)
+        self.fileMenu.addAction(self.captureAct)
+        self.fileMenu.addAction(self.logViewerAct)
+        self.fileMenu.addAction(self.cameraDebugAct)
         self.fileMenu.addSeparator()
         self.fileMenu.addAction(self.exitAct)
 
@@ -164,17 +250,17 @@ class MainWindow(QtGui.QMainWindow):
     def configureTimers(self):
         @QtCore.pyqtSlot() 
         def statsRequests():
-            self.sendComm(["system cpu", "system memory", "system battery"])
+            self.sendComm(["system cpu", "system memory", "system battery"], OutgoingScheduler.POLL)
         self.statsRefreshTimer = QtCore.QTimer()
         self.statsRefreshTimer.timeout.connect(statsRequests)
         @QtCore.pyqtSlot()
         def telemetryRequest():
-            self.sendComm("telemetry raw")
+            self.sendComm("telemetry raw", OutgoingScheduler.POLL)
         self.telemetryRefreshTimer = QtCore.QTimer()
         self.telemetryRefreshTimer.timeout.connect(telemetryRequest)
         @QtCore.pyqtSlot()
         def speedRequest():
-            self.sendComm("motor speed")
+            self.sendComm("motor speed", OutgoingScheduler.POLL)
         self.speedRefreshTimer = QtCore.QTimer()
         self.speedRefreshTimer.timeout.connect(speedRequest)
         
@@ -186,12 +272,34 @@ class MainWindow(QtGui.QMainWindow):
         self.leftPanel = LeftPanel()
         
         ### COMMUNICATION CONSOLE
-        self.commConsole = QtGui.QPlainTextEdit()
+        self.commConsole = QRingConsole()
         self.commConsole.setSizePolicy(QtGui.QSizePolicy.Expanding, QtGui.QSizePolicy.Expanding)
-        self.commConsole.setReadOnly(True)
-        self.commConsole.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.commConsole.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
-        self.commConsole.setMaximumBlockCount(500)
+        
+        self.commPauseBtn = QtGui.QPushButton("Pause")
+        self.commPauseBtn.setCheckable(True)
+        self.commPauseBtn.setStatusTip("Freeze the console, incomming lines are held back")
+        self.commPauseBtn.toggled.connect(self.commConsole.setPaused)
+        self.commFilter = QtGui.QLineEdit()
+        self.commFilter.setPlaceholderText("Filter")
+        self.commFilter.setStatusTip("Show only lines containing this text")
+        self.commFilter.textChanged.connect(self.commConsole.setFilter)
+        self.commFind = QtGui.QLineEdit()
+        self.commFind.setPlaceholderText("Find")
+        self.commFind.setStatusTip("Enter finds next line containing this text")
+        self.commFind.returnPressed.connect(lambda: self.commConsole.find(self.commFind.text()))
+        self.commFindPrevBtn = QtGui.QPushButton("<")
+        self.commFindPrevBtn.setMaximumWidth(30)
+        self.commFindPrevBtn.clicked.connect(lambda: self.commConsole.find(self.commFind.text(), True))
+        self.commFindNextBtn = QtGui.QPushButton(">")
+        self.commFindNextBtn.setMaximumWidth(30)
+        self.commFindNextBtn.clicked.connect(lambda: self.commConsole.find(self.commFind.text()))
+        
+        commTools = QtGui.QHBoxLayout()
+        commTools.addWidget(self.commPauseBtn)
+        commTools.addWidget(self.commFilter)
+        commTools.addWidget(self.commFind)
+        commTools.addWidget(self.commFindPrevBtn)
+        commTools.addWidget(self.commFindNextBtn)
         
         self.commInput = QHistoryLineEdit()
         self.commSendBtn = QtGui.QPushButton("->")
@@ -201,9 +309,10 @@ class MainWindow(QtGui.QMainWindow):
         commWidget = QtGui.QWidget()
         commLayout = QtGui.QGridLayout()
         commLayout.setMargin(0)
-        commLayout.addWidget(self.commConsole, 0, 0, 1, 2)
-        commLayout.addWidget(self.commInput, 1, 0, 1, 1)
-        commLayout.addWidget(self.commSendBtn, 1, 1, 1, 1)
+        commLayout.addLayout(commTools, 0, 0, 1, 2)
+        commLayout.addWidget(self.commConsole, 1, 0, 1, 2)
+        commLayout.addWidget(self.commInput, 2, 0, 1, 1)
+        commLayout.addWidget(self.commSendBtn, 2, 1, 1, 1)
         commWidget.setLayout(commLayout)
         
         ### LOG CONSOLE
@@ -229,6 +338,7 @@ class MainWindow(QtGui.QMainWindow):
         self.trajectoryPanel = TrajectoryTab()
         self.sdPanel = QtGui.QWidget()
         self.cameraPanel = CameraTab()
+        self.diagnosticsPanel = DiagnosticsTab()
         
         self.centerPanel = QtGui.QTabWidget()
         self.centerPanel.setMinimumHeight(400)
@@ -237,7 +347,8 @@ class MainWindow(QtGui.QMainWindow):
         self.centerPanel.addTab(self.motorsPanel, "&Motors")
         self.centerPanel.addTab(self.trajectoryPanel, "T&rajectory")
         self.centerPanel.addTab(self.sdPanel, "&SD card")
-        self.centerPanel.addTab(self.cameraPanel, "&Camera")        
+        self.centerPanel.addTab(self.cameraPanel, "&Camera")
+        self.centerPanel.addTab(self.diagnosticsPanel, "&Diagnostics")        
         
         ### SPLITTER
         splitter = QtGui.QSplitter()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+###
+# monotonic() returns seconds from an arbitrary point that never jumps with
+# wall clock changes, use it for measuring intervals, never for display
+# Linux: clock_gettime(CLOCK_MONOTONIC), Windows: time.clock (performance
+# counter), elsewhere falls back to time.time
+###
+
+import sys
+import time
+import ctypes
+import ctypes.util
+
+CLOCK_MONOTONIC = 1
+
+class _timespec(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+def _posixClock():
+    try:
+        library = ctypes.CDLL(ctypes.util.find_library('rt') or ctypes.util.find_library('c'), use_errno=True)
+        clock_gettime = library.clock_gettime
+    except (OSError, AttributeError, TypeError):
+        return None
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(_timespec)]
+    byref = ctypes.byref
+    
+    def monotonic():
+        spec = _timespec()
+        if clock_gettime(CLOCK_MONOTONIC, byref(spec)) != 0:
+            raise OSError(ctypes.get_errno(), "clock_gettime failed")
+        return spec.tv_sec + spec.tv_nsec * 1e-9
+    return monotonic
+
+if sys.platform.startswith('linux'):
+    monotonic = _posixClock() or time.time
+elif sys.platform == 'win32':
+    monotonic = time.clock
+else:
+    monotonic = time.time
+    
+if __name__ == '__main__':
+    import timeit
+    print "monotonic() = %.6f, %.2fus per call" % (monotonic(), 
+        timeit.timeit(monotonic, number=100000) / 100000 * 1e6)
@@ -1,33 +1,88 @@
 #!/usr/bin/etc python
 
 import re
+import time
 import types
 import Queue
+from collections import deque
+import sre_parse
+import sre_constants
+
+PREFIX_MAX = 8
+
+# literal text every match of compiled regex starts with (may be empty)
+def literal_prefix(regex_c):
+    if regex_c.flags & re.IGNORECASE:
+        return ''
+    prefix = []
+    for op, arg in sre_parse.parse(regex_c.pattern, regex_c.flags):
+        if op == sre_constants.AT and arg in (sre_constants.AT_BEGINNING, sre_constants.AT_BEGINNING_STRING) and not prefix:
+            continue
+        if op != sre_constants.LITERAL:
+            break
+        prefix.append(unichr(arg) if isinstance(regex_c.pattern, unicode) else chr(arg))
+    return ''.join(prefix)
+
+class RuleStats:
+    def __init__(self):
+        self.reset()
+        
+    def reset(self):
+        self.tried = 0
+        self.hits = 0
+        self.match_time = 0.0
+        self.handler_time = 0.0
+        
+    def report(self, name):
+        return {'rule': name, 'tried': self.tried, 'hits': self.hits,
+            'match_time': self.match_time, 'handler_time': self.handler_time,
+            'match_mean': self.match_time / self.tried if self.tried else 0.0,
+            'handler_mean': self.handler_time / self.hits if self.hits else 0.0}
 
 class Rule:
-    def __init__(self, regexp, handler):
+    def __init__(self, regexp, handler, parser=None):
         self.regexp = regexp
         self.regex_c = re.compile(regexp)
         self.handler = handler
+        self.parser = parser
+        self.stats = RuleStats()
         
-class Payload:
-    def __init__(self, message, match, time=None):
+class Payload(object):
+    __slots__ = ('message', 'match', 'timestamp', 'arrived')
+    
+    def __init__(self, message, match, time=None, arrived=None):
         self.message = message
         self.match = match
         self.timestamp = time
+        self.arrived = arrived
         
-class HandlerResult:
-    def __init__(self, handler, match):
-        self.handler = handler
-        self.match = match
-
 class MsgDispatcher:
-    def __init__(self, prompt=None):
+###
+# Rules are indexed by their literal prefix (up to PREFIX_MAX characters),
+# so a message only runs the regexes of rules it can match. Lookup costs
+# one slice and dict get per distinct prefix length, whatever the number
+# of rules. Rules without literal prefix are tried for every message.
+# Matching rules are still called in registration order.
+# With instrumented set, per rule match attempts, hits, regex (or parser)
+# time and handler time are counted, see stats(). Messages no rule matched
+# are counted as misses, the last MISSES_KEPT are kept for inspection.
+# A single Payload is reused for every handler call, handlers must not keep
+# it past their return. Queue handlers get their own copy.
+###
+    MISSES_KEPT = 50
+    
+    def __init__(self, prompt=None, instrumented=False):
         self.dispatch_rules = []
+        self._index = None
         self.default_handler = lambda x: None
         self.all_handler = lambda x: None
         self.prompt = prompt
         self.lprompt = len(self.prompt) if self.prompt else None
+        self.instrumented = instrumented
+        self.default_stats = RuleStats()
+        self.all_stats = RuleStats()
+        self.recent_misses = deque(maxlen=self.MISSES_KEPT)
+        self._payload = Payload(None, None)
  
     def dispatch(self, message):
         if self.prompt and len(message.payload) >= self.lprompt and message.payload[0:self.lprompt] == self.prompt:
@@ -35,29 +90,133 @@ class MsgDispatcher:
         else:
             msg = message.payload
             
-        if len(msg) > 0:           
-            handlers = self.get_handlers(msg)
-            for h in handlers:
-                payload = Payload(msg, h.match, message.timestamp)
-                if isinstance(h.handler, Queue.Queue):
-                    h.handler.put(payload)
-                else:
-                    h.handler(payload)
+        if len(msg) > 0:
+            payload = self._payload
+            payload.message = msg
+            payload.timestamp = message.timestamp
+            payload.arrived = message.arrived
+            self._dispatch(msg, payload, self.instrumented)
                 
-    def get_handlers(self, message):
-        handlers = []
-        for rule in self.dispatch_rules:
-            match = rule.regex_c.match(message)
+    def _call(self, handler, payload):
+        if isinstance(handler, Queue.Queue):
+            handler.put(Payload(payload.message, payload.match, payload.timestamp, payload.arrived))
+        else:
+            handler(payload)
+            
+    # one lookup for both modes, instrumented adds per rule counts and times
+    def _dispatch(self, msg, payload, instrumented):
+        clock = time.time
+        matched = False
+        for rule in self.candidates(msg):
+            if instrumented:
+                start = clock()
+            if rule.parser:
+                match = rule.parser(msg)
+            else:
+                match = rule.regex_c.match(msg)
+            if instrumented:
+                end = clock()
+                stats = rule.stats
+                stats.tried += 1
+                stats.match_time += end - start
             if match:
-                handlers.append(HandlerResult(rule.handler, match))
-        if len(handlers) == 0:
-            handlers.append(HandlerResult(self.default_handler, None))
+                matched = True
+                payload.match = match
+                self._call(rule.handler, payload)
+                if instrumented:
+                    stats.hits += 1
+                    stats.handler_time += clock() - end
+        payload.match = None
+        if not matched:
+            self.recent_misses.append(msg)
+            if instrumented:
+                self._call_counted(self.default_stats, self.default_handler, payload)
+            else:
+                self.default_stats.hits += 1
+                self._call(self.default_handler, payload)
         if self.all_handler:
-            handlers.append(HandlerResult(self.all_handler, None))
-        return handlers
+            if instrumented:
+                self._call_counted(self.all_stats, self.all_handler, payload)
+            else:
+                self._call(self.all_handler, payload)
+            
+    def _call_counted(self, stats, handler, payload):
+        start = time.time()
+        self._call(handler, payload)
+        stats.tried += 1
+        stats.hits += 1
+        stats.handler_time += time.time() - start
+        
+    # list of per rule dicts in registration order, then <default> (misses) and <all>
+    # rules handled by a worker (e.g. HandlerWorker) carry its workerStats() as 'worker'
+    def stats(self):
+        report = []
+        for rule in self.dispatch_rules:
+            report.append(rule.stats.report(rule.regex_c.pattern))
+            if hasattr(rule.handler, 'workerStats'):
+                report[-1]['worker'] = rule.handler.workerStats()
+        report.append(self.default_stats.report('<default>'))
+        report.append(self.all_stats.report('<all>'))
+        return report
+        
+    def workers(self):
+        return [rule.handler for rule in self.dispatch_rules if hasattr(rule.handler, 'workerStats')]
+        
+    def misses(self):
+        return self.default_stats.hits
+        
+    def reset_stats(self):
+        for rule in self.dispatch_rules:
+            rule.stats.reset()
+        self.default_stats.reset()
+        self.all_stats.reset()
+        self.recent_misses.clear()
+                
+    def candidates(self, message):
+        if self._index is None:
+            self._build_index()
+        found = None
+        merged = False
+        for length, table in self._index:
+            rules = table.get(message[:length])
+            if rules:
+                if found is None:
+                    found = rules
+                else:
+                    found = found + rules
+                    merged = True
+        if self._unprefixed:
+            if found is None:
+                return self._unprefixed
+            found = found + self._unprefixed
+            merged = True
+        if found is None:
+            return ()
+        if merged:
+            found.sort(key=self._order.__getitem__)
+        return found
+        
+    def _build_index(self):
+        tables = {}
+        self._unprefixed = []
+        self._order = {}
+        for position, rule in enumerate(self.dispatch_rules):
+            self._order[rule] = position
+            prefix = literal_prefix(rule.regex_c)[:PREFIX_MAX]
+            if prefix:
+                tables.setdefault(len(prefix), {}).setdefault(prefix, []).append(rule)
+            else:
+                self._unprefixed.append(rule)
+        self._index = sorted(tables.items())
 
     def register(self, regex, function):
         self.dispatch_rules.append(Rule(re.compile(regex), function))
+        self._index = None
+        
+    # parser(message) returns a match-like object or None, e.g. FieldParser
+    def register_parser(self, parser, function):
+        self.dispatch_rules.append(Rule(parser.regex_c, function, parser))
+        self._index = None
 
     def register_default(self, handler):
         self.default_handler = handler
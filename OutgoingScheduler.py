@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+import time
+from collections import deque
+from WakeupQueue import WakeupQueue
+
+class OutgoingScheduler(WakeupQueue):
+###
+# Outgoing queue with priority lanes, drop-in for WakeupQueue
+# put(message) queues on MANUAL lane, put((lane, message)) on given lane
+# get() always serves MANUAL (console, buttons) before POLL (timer requests)
+# A POLL message identical to one still waiting is merged into it
+# "log <stream>" / "log <stream> off" commands are remembered, so active
+# subscriptions can be replayed after reconnection
+###
+    MANUAL, POLL = 0, 1
+    LANE_NAMES = ("manual", "poll")
+
+    def _init(self, maxsize):
+        WakeupQueue._init(self, maxsize)
+        self._lanes = [deque() for _ in self.LANE_NAMES]
+        self._queuedPolls = set()
+        self._subscriptions = {}
+        self._stats = [{'enqueued': 0, 'merged': 0, 'sent': 0, 'waitTotal': 0.0, 'waitMax': 0.0}
+            for _ in self.LANE_NAMES]
+
+    def _qsize(self, len=len):
+        return sum(len(lane) for lane in self._lanes)
+
+    def _put(self, item):
+        if isinstance(item, tuple):
+            lane, message = item
+        else:
+            lane, message = self.MANUAL, item
+        words = message.split() if message.startswith("log ") else None
+        if words and len(words) > 1:
+            if words[-1] == "off":
+                self._subscriptions.pop(" ".join(words[1:-1]), None)
+            else:
+                self._subscriptions[" ".join(words[1:])] = message
+        stats = self._stats[lane]
+        if lane == self.POLL:
+            if message in self._queuedPolls:
+                stats['merged'] += 1
+                return
+            self._queuedPolls.add(message)
+        stats['enqueued'] += 1
+        self._lanes[lane].append((message, time.time()))
+        self.wakeup()
+
+    def _get(self):
+        for lane, queue in enumerate(self._lanes):
+            if queue:
+                message, queued = queue.popleft()
+                if lane == self.POLL:
+                    self._queuedPolls.discard(message)
+                wait = time.time() - queued
+                stats = self._stats[lane]
+                stats['sent'] += 1
+                stats['waitTotal'] += wait
+                stats['waitMax'] = max(stats['waitMax'], wait)
+                return message
+
+    def subscriptions(self):
+        with self.mutex:
+            return self._subscriptions.values()
+
+    def laneStats(self):
+        with self.mutex:
+            result = {}
+            for lane, name in enumerate(self.LANE_NAMES):
+                stats = dict(self._stats[lane])
+                stats['depth'] = len(self._lanes[lane])
+                stats['waitMean'] = stats['waitTotal'] / stats['sent'] if stats['sent'] else 0.0
+                if self._lanes[lane]:
+                    stats['oldestWait'] = time.time() - self._lanes[lane][0][1]
+                else:
+                    stats['oldestWait'] = 0.0
+                result[name] = stats
+            return result
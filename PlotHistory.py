@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+import numpy as np
+
+from TelemetryStore import toSeconds
+
+class PlotHistory(object):
+###
+# Time window of (x, y) samples for a live plot, kept in one NumPy buffer
+# Rows are time, x and y. append() writes behind the last sample, trim()
+# moves the start past samples older than a given time with searchsorted,
+# so times(), x() and y() are contiguous views, given to setData as they are.
+# When the end of the buffer is reached the window is moved to the front,
+# or the buffer doubled when the window fills more than half of it, so a
+# sample costs amortized O(1) whatever the window length. extend() adds
+# a block of samples the same way, e.g. rows read with TelemetryStream.tail.
+# Samples must be appended in time order.
+###
+    def __init__(self, capacity=1024):
+        self._data = np.empty((3, capacity), 'f8')
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def clear(self):
+        self._start = 0
+        self._end = 0
+
+    def append(self, timestamp, x, y):
+        if self._end == self._data.shape[1]:
+            self._compact()
+        column = self._end
+        self._data[0, column] = toSeconds(timestamp)
+        self._data[1, column] = x
+        self._data[2, column] = y
+        self._end = column + 1
+
+    # many samples at once, e.g. new rows of a TelemetryStream
+    def extend(self, times, x, y):
+        count = len(times)
+        if self._end + count > self._data.shape[1]:
+            self._compact(count)
+        end = self._end + count
+        self._data[0, self._end:end] = times
+        self._data[1, self._end:end] = x
+        self._data[2, self._end:end] = y
+        self._end = end
+
+    # drops samples older than timestamp
+    def trim(self, timestamp):
+        self._start += int(self._data[0, self._start:self._end].searchsorted(toSeconds(timestamp), 'left'))
+
+    def times(self):
+        return self._data[0, self._start:self._end]
+
+    def x(self):
+        return self._data[1, self._start:self._end]
+
+    def y(self):
+        return self._data[2, self._start:self._end]
+
+    # makes room for extra samples behind the window
+    def _compact(self, extra=0):
+        count = self._end - self._start
+        data = self._data
+        size = data.shape[1]
+        while 2*(count + extra) > size:
+            size *= 2
+        if size != data.shape[1]:
+            data = np.empty((3, size), 'f8')
+        data[:, :count] = self._data[:, self._start:self._end].copy()
+        self._data = data
+        self._start = 0
+        self._end = count
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+import os
+import select
+
+class Poller:
+###
+# Thin wrapper over epoll (Linux) with select() fallback (Windows, others)
+# Works on raw file descriptors, poll() returns lists of ready descriptors
+###
+    def __init__(self):
+        self._epoll = select.epoll() if hasattr(select, 'epoll') else None
+        self._readers = set()
+        self._writers = set()
+
+    def close(self):
+        if self._epoll is not None:
+            self._epoll.close()
+
+    def register(self, fd, write=False):
+        self._readers.add(fd)
+        if write:
+            self._writers.add(fd)
+        if self._epoll is not None:
+            self._epoll.register(fd, self._mask(fd))
+
+    def modify(self, fd, write):
+        if write == (fd in self._writers):
+            return
+        if write:
+            self._writers.add(fd)
+        else:
+            self._writers.discard(fd)
+        if self._epoll is not None:
+            self._epoll.modify(fd, self._mask(fd))
+
+    def unregister(self, fd):
+        self._readers.discard(fd)
+        self._writers.discard(fd)
+        if self._epoll is not None:
+            try:
+                self._epoll.unregister(fd)
+            except (IOError, OSError, ValueError):
+                # a closed descriptor has already left the epoll set
+                pass
+
+    def poll(self, timeout=None):
+        if self._epoll is None:
+            readers = list(self._readers)
+            return select.select(readers, list(self._writers), readers, timeout)
+
+        readable, writable, exceptional = [], [], []
+        for fd, events in self._epoll.poll(-1 if timeout is None else timeout):
+            if events & (select.EPOLLIN | select.EPOLLHUP):
+                readable.append(fd)
+            if events & select.EPOLLOUT:
+                writable.append(fd)
+            if events & select.EPOLLERR:
+                exceptional.append(fd)
+        return readable, writable, exceptional
+
+    # registered descriptors that can no longer be polled, e.g. closed
+    # but still registered, which makes every select() call fail
+    def broken(self):
+        found = []
+        for fd in list(self._readers):
+            try:
+                if self._epoll is None:
+                    select.select([fd], [], [], 0)
+                else:
+                    os.fstat(fd)
+            except (select.error, OSError, ValueError):
+                found.append(fd)
+        return found
+
+    def _mask(self, fd):
+        mask = select.EPOLLIN
+        if fd in self._writers:
+            mask |= select.EPOLLOUT
+        return mask
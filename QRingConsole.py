@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+
+from collections import deque
+
+from PyQt4 import QtCore, QtGui
+from PyQt4.QtCore import Qt
+
+from LineRing import LineRing
+
+# slots get a QString (or str from Python callers), serial noise and user
+# input may be anything, so never str() them
+def toUnicode(text):
+    if isinstance(text, str):
+        return text.decode('latin-1')
+    return unicode(text)
+
+class QRingConsole(QtGui.QAbstractScrollArea):
+###
+# Read-only console for high line rates, drop-in for the appendPlainText
+# use of QPlainTextEdit. Lines live in a LineRing of capacity lines, only
+# the visible rows are painted. Appending just stores the lines and arms a
+# single shot timer, so scroll range and repaint happen at most once per
+# FRAME_MS, however many lines arrive.
+# Follows the tail while scrolled to the bottom, otherwise keeps the top
+# line in place. While paused new lines are held back (at most capacity of
+# them) and appended on resume. Click selects a row, Ctrl+C copies it.
+# setModel() shows any other source of rows with the LineRing row interface
+# (rows, seqAt, rowOf, rowLines, line, first, find, setFilter) instead.
+###
+    FRAME_MS = 16
+
+    def __init__(self, capacity=100000, parent=None):
+        super(QRingConsole, self).__init__(parent)
+        self.ring = LineRing(capacity)
+        self.paused = False
+        self._held = deque(maxlen=capacity)
+        self._follow = True
+        self._topSeq = 0
+        self._current = None
+        self._updating = False
+
+        font = QtGui.QFont("Monospace")
+        font.setStyleHint(QtGui.QFont.TypeWriter)
+        self.setFont(font)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
+        self.viewport().setBackgroundRole(QtGui.QPalette.Base)
+        self.viewport().setAutoFillBackground(True)
+        self.verticalScrollBar().valueChanged.connect(self._scrolled)
+
+        self._frameTimer = QtCore.QTimer(self)
+        self._frameTimer.setSingleShot(True)
+        self._frameTimer.setInterval(self.FRAME_MS)
+        self._frameTimer.timeout.connect(self._refresh)
+
+    # text may be a block of lines joined by '\n'
+    @QtCore.pyqtSlot(str)
+    def appendPlainText(self, text):
+        lines = toUnicode(text).split(u'\n')
+        if self.paused:
+            self._held.extend(lines)
+        else:
+            self.ring.append(lines)
+            self.scheduleRefresh()
+
+    def setModel(self, model):
+        self.ring = model
+        self._current = None
+        self._follow = False
+        self._topSeq = 0
+        self._refresh()
+
+    # model has new rows, repaint with the next frame
+    @QtCore.pyqtSlot()
+    def scheduleRefresh(self):
+        if not self._frameTimer.isActive():
+            self._frameTimer.start()
+
+    @QtCore.pyqtSlot()
+    def clear(self):
+        self.ring.clear()
+        self._held.clear()
+        self._current = None
+        self._follow = True
+        self._refresh()
+
+    @QtCore.pyqtSlot(bool)
+    def setPaused(self, paused):
+        self.paused = paused
+        if not paused and self._held:
+            self.ring.append(list(self._held))
+            self._held.clear()
+            self._refresh()
+
+    @QtCore.pyqtSlot(str)
+    def setFilter(self, text):
+        self.ring.setFilter(toUnicode(text))
+        if self._current is not None and not self._follow:
+            self._topSeq = self._current
+        self._refresh()
+
+    # selects the next (previous) row containing text, False if there is none
+    @QtCore.pyqtSlot(str)
+    def find(self, text, backward=False):
+        text = toUnicode(text)
+        if not text:
+            return False
+        if self._current is None:
+            start = self.ring.rows() - 1 if backward else 0
+        else:
+            start = self.ring.rowOf(self._current)
+            if backward:
+                start -= 1
+            elif start < self.ring.rows() and self.ring.seqAt(start) == self._current:
+                start += 1
+        row = self.ring.find(text, start, backward)
+        if row < 0:
+            return False
+        self.select(row)
+        return True
+
+    # selects and shows a row
+    def select(self, row):
+        if not 0 <= row < self.ring.rows():
+            return
+        self._current = self.ring.seqAt(row)
+        self._scrollTo(row)
+
+    def _scrollTo(self, row):
+        bar = self.verticalScrollBar()
+        if row < bar.value() or row >= bar.value() + self._pageRows():
+            self._follow = False
+            self._topSeq = self.ring.seqAt(max(0, row - self._pageRows() // 2))
+        self._refresh()
+
+    def _pageRows(self):
+        return max(1, self.viewport().height() // self.fontMetrics().lineSpacing())
+
+    @QtCore.pyqtSlot()
+    def _refresh(self):
+        bar = self.verticalScrollBar()
+        page = self._pageRows()
+        self._updating = True
+        bar.setRange(0, max(0, self.ring.rows() - page))
+        bar.setPageStep(page)
+        if self._follow:
+            bar.setValue(bar.maximum())
+        else:
+            bar.setValue(self.ring.rowOf(self._topSeq))
+        self._updating = False
+        self.viewport().update()
+
+    @QtCore.pyqtSlot(int)
+    def _scrolled(self, value):
+        if self._updating:
+            return
+        bar = self.verticalScrollBar()
+        self._follow = value >= bar.maximum()
+        if value < self.ring.rows():
+            self._topSeq = self.ring.seqAt(value)
+        self.viewport().update()
+
+    def resizeEvent(self, event):
+        super(QRingConsole, self).resizeEvent(event)
+        self._refresh()
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self.viewport())
+        metrics = self.fontMetrics()
+        spacing = metrics.lineSpacing()
+        width = self.viewport().width()
+        palette = self.palette()
+        top = self.verticalScrollBar().value()
+        for i, (seq, line) in enumerate(self.ring.rowLines(top, top + self._pageRows() + 1)):
+            y = i * spacing
+            if seq == self._current:
+                painter.fillRect(0, y, width, spacing, palette.highlight())
+                painter.setPen(palette.color(QtGui.QPalette.HighlightedText))
+            else:
+                painter.setPen(palette.color(QtGui.QPalette.Text))
+            painter.drawText(2, y + metrics.ascent(), line)
+
+    def mousePressEvent(self, event):
+        row = self.verticalScrollBar().value() + event.pos().y() // self.fontMetrics().lineSpacing()
+        if row < self.ring.rows():
+            self._current = self.ring.seqAt(row)
+            self.viewport().update()
+
+    def keyPressEvent(self, event):
+        if event.matches(QtGui.QKeySequence.Copy) and self._current is not None:
+            if self._current >= self.ring.first:
+                QtGui.QApplication.clipboard().setText(self.ring.line(self._current))
+        else:
+            super(QRingConsole, self).keyPressEvent(event)
@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+###
+# Stand-in for the robot, speaks the odin> line protocol over TCP and/or a pty
+# Usage: python RobotSimulator.py --tcp 4000 --pty --rate 5000
+# Connect the GUI to 127.0.0.1:4000 or to the printed /dev/pts/N device
+###
+
+import errno
+import fcntl
+import math
+import os
+import random
+import socket
+import threading
+import time
+import tty
+
+from Poller import Poller
+
+PROMPT = "odin>"
+# "reset" (Reset!) is available too, but left out by default as it resets the GUI
+DEFAULT_MIX = "tel=60,speed=20,battery=3,cpu=3,memory=3,camera=8,rc5=3"
+
+class SimulatedLink:
+###
+# One connected client, fd based so TCP sockets and pty masters look the same
+###
+    MAX_BACKLOG = 4*1024*1024
+
+    def __init__(self, fd, name, closeFunc):
+        self.fd = fd
+        self.name = name
+        self.closeFunc = closeFunc
+        self.inbuffer = ''
+        self.outbuffer = ''
+        self.subscriptions = set()
+        self.dropped = 0
+
+    def queue(self, lines):
+        if len(self.outbuffer) > self.MAX_BACKLOG:
+            self.dropped += len(lines)
+            return 0
+        self.outbuffer += ''.join(PROMPT + line + "\r\n" for line in lines)
+        return len(lines)
+
+    def flush(self):
+        try:
+            written = os.write(self.fd, self.outbuffer)
+        except OSError as e:
+            if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return
+            raise
+        self.outbuffer = self.outbuffer[written:]
+
+class RobotSimulator:
+###
+# Generates background traffic at a given rate (lines/s) with a given mix
+# of message types and answers the command set the GUI sends
+###
+    def __init__(self, rate=100.0, mix=DEFAULT_MIX, logRate=50.0, seed=None):
+        self.rate = float(rate)
+        self.logRate = float(logRate)
+        self.random = random.Random(seed)
+        self.mix = []
+        total = 0.0
+        for entry in mix.split(','):
+            if entry:
+                kind, weight = entry.split('=')
+                total += float(weight)
+                self.mix.append((total, kind))
+        self.mixTotal = total
+        self.links = {}
+        self.listeners = {}
+        self.poller = Poller()
+        self.started = time.time()
+        self.sent = 0
+        self._alive = threading.Event()
+        self._alive.set()
+
+    # robot state
+    def pose(self):
+        t = time.time() - self.started
+        return (1000.0*math.cos(0.2*t), 1000.0*math.sin(0.2*t), (math.degrees(0.2*t) + 90.0) % 360.0 - 180.0)
+
+    def line(self, kind):
+        if kind == 'tel':
+            return "[Tel] X: %.3f Y: %.3f O: %.3f" % self.pose()
+        if kind == 'speed':
+            return "[Speed] L: %.3f R: %.3f" % (200.0 + self.random.uniform(-5, 5), 240.0 + self.random.uniform(-5, 5))
+        if kind == 'battery':
+            return "Battery voltage: %.2fV" % (7.4 - (time.time() - self.started)/3600.0)
+        if kind == 'cpu':
+            return "CPU usage: %.2f" % (self.random.uniform(10.0, 60.0))
+        if kind == 'memory':
+            return "Available memory: %dkB" % (self.random.randint(20, 40))
+        if kind == 'camera':
+            x, y, o = self.pose()
+            o = math.radians(o)
+            return "[Camera] Radio: %.3f %.3f %.4f Pred: %.3f %.3f %.4f Odo: %.3f %.3f %.4f Filt: %.3f %.3f %.4f Time: %d" % (
+                x, y, o, x+1, y-1, o, x, y, o, x+0.5, y-0.5, o, int((time.time() - self.started)*1000))
+        if kind == 'rc5':
+            return "[RC5] Received %d" % (self.random.randint(0, 63))
+        if kind == 'reset':
+            return "Reset!"
+        return "[Log] " + kind
+
+    def randomLine(self):
+        pick = self.random.uniform(0.0, self.mixTotal)
+        for bound, kind in self.mix:
+            if pick <= bound:
+                return self.line(kind)
+        return self.line(self.mix[-1][1])
+
+    def handle(self, link, command):
+        words = command.split()
+        if not words:
+            return []
+        if words[0] == "system" and len(words) > 1:
+            return [self.line({'cpu': 'cpu', 'memory': 'memory', 'battery': 'battery'}.get(words[1], words[1]))]
+        if command == "telemetry raw":
+            return [self.line('tel')]
+        if command == "motor speed":
+            return [self.line('speed')]
+        if words[0] == "log" and len(words) > 1:
+            if words[-1] == "off":
+                link.subscriptions.discard(words[1])
+            else:
+                link.subscriptions.add(words[1])
+            return []
+        if command == "radio test":
+            return ["[Debug] Radio test passed"]
+        if command in ("radio on", "radio off"):
+            return []
+        if command == "reset":
+            link.subscriptions.clear()
+            return ["Reset!"]
+        return ["Unknown command: " + command]
+
+    # serving
+    def listenTCP(self, port, host='127.0.0.1'):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((host, port))
+        server.listen(5)
+        server.setblocking(0)
+        self.listeners[server.fileno()] = server
+        self.poller.register(server.fileno())
+        return server.getsockname()
+
+    def openPty(self):
+        master, slave = os.openpty()
+        tty.setraw(master)
+        tty.setraw(slave)
+        fcntl.fcntl(master, fcntl.F_SETFL, fcntl.fcntl(master, fcntl.F_GETFL) | os.O_NONBLOCK)
+        self._addLink(master, "pty", lambda: None)
+        self._ptySlave = slave
+        return os.ttyname(slave)
+
+    def _addLink(self, fd, name, closeFunc):
+        link = SimulatedLink(fd, name, closeFunc)
+        self.links[fd] = link
+        self.poller.register(fd)
+        return link
+
+    def _dropLink(self, link):
+        self.poller.unregister(link.fd)
+        del self.links[link.fd]
+        link.closeFunc()
+        if link.dropped:
+            print "%s: dropped %d lines, client too slow" % (link.name, link.dropped)
+
+    def stop(self):
+        self._alive.clear()
+
+    def serve(self, duration=None):
+        tick = 0.001
+        last = time.time()
+        owed = 0.0
+        logOwed = 0.0
+        end = None if duration is None else last + duration
+        while self._alive.isSet() and (end is None or time.time() < end):
+            readable, writable, _ = self.poller.poll(tick)
+            for fd in readable:
+                if fd in self.listeners:
+                    conn, address = self.listeners[fd].accept()
+                    conn.setblocking(0)
+                    self._addLink(conn.fileno(), "%s:%d" % address, conn.close)
+                elif fd in self.links:
+                    self._receive(self.links[fd])
+
+            now = time.time()
+            owed += self.rate * (now - last)
+            logOwed += self.logRate * (now - last)
+            last = now
+            background = [self.randomLine() for _ in xrange(int(owed))]
+            owed -= len(background)
+            logs = int(logOwed)
+            logOwed -= logs
+
+            for link in self.links.values():
+                lines = list(background)
+                for _ in xrange(logs):
+                    if 'telemetry' in link.subscriptions:
+                        lines.append(self.line('tel'))
+                    if 'speed' in link.subscriptions:
+                        lines.append(self.line('speed'))
+                if lines:
+                    self.sent += link.queue(lines)
+                self._send(link)
+
+    def _receive(self, link):
+        try:
+            data = os.read(link.fd, 4096)
+        except OSError as e:
+            if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return
+            data = ''
+        if not data:
+            if link.name != "pty":
+                self._dropLink(link)
+            return
+        link.inbuffer += data
+        lines = link.inbuffer.split('\n')
+        link.inbuffer = lines.pop()
+        replies = []
+        for command in lines:
+            replies += self.handle(link, command.strip())
+        if replies:
+            self.sent += link.queue(replies)
+        self._send(link)
+
+    def _send(self, link):
+        if link.outbuffer:
+            try:
+                link.flush()
+            except OSError:
+                self._dropLink(link)
+                return
+        self.poller.modify(link.fd, len(link.outbuffer) > 0)
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tcp', type=int, default=None, metavar='PORT', help="serve over TCP on this port")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--pty', action='store_true', help="serve over a pseudo terminal")
+    parser.add_argument('--rate', type=float, default=100.0, help="background lines per second (1-50000)")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="background message mix, kind=weight,...")
+    parser.add_argument('--log-rate', type=float, default=50.0, help="lines per second for 'log telemetry/speed'")
+    parser.add_argument('--duration', type=float, default=None, help="stop after this many seconds")
+    args = parser.parse_args()
+    
+    simulator = RobotSimulator(args.rate, args.mix, args.log_rate)
+    if args.tcp is None and not args.pty:
+        args.tcp = 4000
+    if args.tcp is not None:
+        print "Serving TCP on %s:%d" % simulator.listenTCP(args.tcp, args.host)
+    if args.pty:
+        print "Serving serial on " + simulator.openPty()
+    try:
+        simulator.serve(args.duration)
+    except KeyboardInterrupt:
+        pass
+    print "Sent %d lines" % (simulator.sent)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+
+import bisect
+import os
+import shutil
+import tempfile
+import threading
+import Queue
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from Monotonic import monotonic
+
+# wall clock times as float seconds since 1970 on the naive local clock,
+# which is what datetime.now() stamps on incomming messages
+EPOCH = datetime(1970, 1, 1)
+
+def toSeconds(timestamp):
+    if timestamp is None:
+        timestamp = datetime.now()
+    if isinstance(timestamp, datetime):
+        return (timestamp - EPOCH).total_seconds()
+    return float(timestamp)
+
+def toDatetime(seconds):
+    return EPOCH + timedelta(seconds=float(seconds))
+
+class TelemetryStream:
+###
+# Append-only time series of one telemetry stream, stored column-wise
+# Rows go to chunks of chunkRows: a float64 time column and a
+# (fields x rows) array of the stream dtype, so every column is contiguous.
+# Full chunks are sealed, with spillDir set they are saved as .npy files
+# and memory-mapped back, memory use stays bounded however long we run.
+# spill(function, *args) decides where saving runs, TelemetryStore hands
+# it to its own thread so the appending (transport) thread never waits
+# for the disk; the chunk is read from memory until it is swapped.
+# Without spill it runs in append(). A chunk that cannot be saved stays
+# in memory and is counted in spillFailures.
+# Times are monotonic() seconds, None stamps a row with the current one.
+# They never go back, a row stamped earlier than the previous one (two
+# threads racing to append) gets the previous time, so the time column
+# stays sorted. views() finds the chunks with bisect and the rows with
+# searchsorted, O(log n), and returns views, not copies.
+# One writer thread, any number of reader threads.
+###
+    def __init__(self, name, fields, dtype='f8', chunkRows=65536, spillDir=None, spill=None):
+        self.name = name
+        self.fields = tuple(fields)
+        self.dtype = np.dtype(dtype)
+        self.chunkRows = chunkRows
+        self.spillDir = spillDir
+        self.spill = spill or (lambda function, *args: function(*args))
+        self.spillFailures = 0
+        self._lock = threading.Lock()
+        self._sealed = []
+        self._starts = []
+        self._spilled = []
+        self._last = float('-inf')
+        self._newChunk()
+
+    def __len__(self):
+        return len(self._sealed) * self.chunkRows + self._count
+
+    def column(self, field):
+        return self.fields.index(field)
+
+    def append(self, timestamp, values):
+        t = monotonic() if timestamp is None else timestamp
+        sealed = None
+        with self._lock:
+            if t < self._last:
+                t = self._last
+            self._last = t
+            row = self._count
+            self._times[row] = t
+            self._values[:, row] = values
+            self._count = row + 1
+            if self._count == self.chunkRows:
+                sealed = self._seal()
+        if sealed is not None and self.spillDir is not None:
+            self.spill(self._spill, *sealed)
+
+    def latest(self):
+        with self._lock:
+            if self._count:
+                return self._times[self._count-1], self._values[:, self._count-1]
+            if self._sealed:
+                times, values = self._sealed[-1]
+                return times[-1], values[:, -1]
+        return None
+
+    # list of (times, values) views covering [t0, t1], values are (fields x rows)
+    def views(self, t0=None, t1=None):
+        with self._lock:
+            chunks = list(self._sealed)
+            starts = list(self._starts)
+            if self._count:
+                chunks.append((self._times[:self._count], self._values[:, :self._count]))
+                starts.append(self._times[0])
+        first = max(0, bisect.bisect_right(starts, t0) - 1) if t0 is not None else 0
+        last = bisect.bisect_right(starts, t1) if t1 is not None else len(chunks)
+        result = []
+        for times, values in chunks[first:last]:
+            lo = times.searchsorted(t0, 'left') if t0 is not None else 0
+            hi = times.searchsorted(t1, 'right') if t1 is not None else len(times)
+            if hi > lo:
+                result.append((times[lo:hi], values[:, lo:hi]))
+        return result
+
+    # list of (times, values) views of the rows from row on, for readers that
+    # follow the stream: tail(seen), then seen += rows got, O(1) per call
+    def tail(self, row):
+        first = row // self.chunkRows
+        with self._lock:
+            chunks = self._sealed[first:]
+            if self._count:
+                chunks.append((self._times[:self._count], self._values[:, :self._count]))
+        result = []
+        for i, (times, values) in enumerate(chunks):
+            lo = max(0, row - (first + i) * self.chunkRows)
+            if lo < len(times):
+                result.append((times[lo:], values[:, lo:]))
+        return result
+
+    # single (times, values) pair, a view when the range lies in one chunk, a copy otherwise
+    def range(self, t0=None, t1=None):
+        views = self.views(t0, t1)
+        if len(views) == 1:
+            return views[0]
+        if not views:
+            return np.empty(0, 'f8'), np.empty((len(self.fields), 0), self.dtype)
+        return np.concatenate([v[0] for v in views]), np.concatenate([v[1] for v in views], axis=1)
+
+    def last(self, seconds):
+        latest = self.latest()
+        if latest is None:
+            return self.range()
+        return self.range(latest[0] - seconds, None)
+
+    # time column is times + offset, see TelemetryStore.wallOffset
+    def exportCsv(self, path, t0=None, t1=None, offset=0.0):
+        with open(path, 'w') as f:
+            f.write(",".join(("time",) + self.fields) + "\n")
+            for times, values in self.views(t0, t1):
+                np.savetxt(f, np.vstack((times + offset, values)).T, fmt="%.6f", delimiter=",")
+
+    def close(self):
+        with self._lock:
+            self._sealed = []
+            self._starts = []
+            self._last = float('-inf')
+            self._newChunk()
+            spilled, self._spilled = self._spilled, []
+        self._remove(spilled)
+
+    def _newChunk(self):
+        self._times = np.empty(self.chunkRows, 'f8')
+        self._values = np.empty((len(self.fields), self.chunkRows), self.dtype)
+        self._count = 0
+
+    # (index, times, values) of the chunk just sealed, called with the lock held
+    def _seal(self):
+        times, values = self._times, self._values
+        self._sealed.append((times, values))
+        self._starts.append(times[0])
+        self._newChunk()
+        return len(self._sealed) - 1, times, values
+
+    # saves a sealed chunk and puts memory-mapped copies in its place
+    def _spill(self, index, times, values):
+        base = os.path.join(self.spillDir, "%s.%06d" % (self.name, index))
+        paths = [base + ".t.npy", base + ".v.npy"]
+        try:
+            np.save(paths[0], times)
+            np.save(paths[1], values)
+            mapped = (np.load(paths[0], mmap_mode='r'), np.load(paths[1], mmap_mode='r'))
+        except (IOError, OSError):
+            self.spillFailures += 1
+            self._remove(paths)
+            return
+        with self._lock:
+            # not there if the stream was closed meanwhile
+            current = index < len(self._sealed) and self._sealed[index][0] is times
+            if current:
+                self._sealed[index] = mapped
+                self._spilled += paths
+        if not current:
+            del mapped
+            self._remove(paths)
+
+    def _remove(self, paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+class TelemetryStore:
+###
+# All telemetry streams of one session, see STREAMS for names and fields
+# With spillDir None a temporary directory is used and removed on close()
+# Full chunks are saved there by one spill thread for all streams.
+# wallOffset turns stream times into wall clock seconds (toDatetime),
+# taken once so exported times keep the spacing they were recorded with.
+###
+    STREAMS = (
+        ('pose', ('x', 'y', 'o'), 'f8'),
+        ('speed', ('left', 'right'), 'f8'),
+        ('battery', ('voltage',), 'f4'),
+        ('cpu', ('usage',), 'f4'),
+        ('memory', ('free',), 'i4'),
+        ('camera', ('x', 'y', 'o'), 'f8'),
+    )
+
+    def __init__(self, spillDir=None, chunkRows=65536):
+        self._temporary = spillDir is None
+        self.spillDir = tempfile.mkdtemp(prefix="odin-telemetry-") if spillDir is None else spillDir
+        self._spills = Queue.Queue()
+        self._spiller = threading.Thread(target=self._spillLoop, name="TelemetrySpill")
+        self._spiller.daemon = True
+        self._spiller.start()
+        self.streams = {}
+        for name, fields, dtype in self.STREAMS:
+            self.streams[name] = TelemetryStream(name, fields, dtype, chunkRows, self.spillDir, self._spill)
+        self.wallOffset = toSeconds(None) - monotonic()
+
+    def __getitem__(self, name):
+        return self.streams[name]
+
+    def append(self, name, timestamp, values):
+        self.streams[name].append(timestamp, values)
+
+    # one <directory>/<stream>.csv per non-empty stream, returns written paths
+    def exportCsv(self, directory, t0=None, t1=None):
+        paths = []
+        for name, _, _ in self.STREAMS:
+            if len(self.streams[name]):
+                path = os.path.join(directory, name + ".csv")
+                self.streams[name].exportCsv(path, t0, t1, self.wallOffset)
+                paths.append(path)
+        return paths
+
+    def _spill(self, function, *args):
+        self._spills.put((function, args))
+
+    def _spillLoop(self):
+        while True:
+            job = self._spills.get()
+            if job is None:
+                return
+            function, args = job
+            function(*args)
+
+    def close(self):
+        self._spills.put(None)
+        self._spiller.join()
+        for stream in self.streams.values():
+            stream.close()
+        if self._temporary:
+            shutil.rmtree(self.spillDir, ignore_errors=True)
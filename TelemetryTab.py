@@ -5,17 +5,30 @@ from PyQt4.QtCore import Qt
 import numpy as np
 import pyqtgraph as pg
 import math
-from datetime import datetime
+
+from Monotonic import monotonic
+from PlotHistory import PlotHistory
 
 class TelemetryTab(QtGui.QWidget):
+###
+# XY plot shows the last plotHistoryS seconds of the 'pose' stream of
+# the TelemetryStore, so every sample is drawn, also the ones conflated
+# away on the way to the GUI. Rows not seen yet are copied to PlotHistory
+# on each update, scaled to metres, so a sample costs the same whatever
+# the window. Without a store the updates themselves are plotted.
+# Samples from before plotting was enabled or before the last reset are
+# left out.
+###
     telemetryRefreshChanged = QtCore.pyqtSignal(int)
 
     def __init__(self, parent=None):
         super(TelemetryTab, self).__init__(parent)
         
         self.plotting = False
-        self.telemetryPlotData = []
+        self.telemetryPlotData = PlotHistory()
+        self.plotRow = 0
         self.plotHistoryS = 60
+        self.telemetryStore = None
         
         self.setupGUI()
         self.setupDefaultValues()
@@ -47,6 +60,7 @@ class TelemetryTab(QtGui.QWidget):
         else:
             if not self.plotting:
                 self.plotting = True
+                self.clearPlotData()
                 self.telemetryPlot.clear()
             
     @QtCore.pyqtSlot()
@@ -76,21 +90,33 @@ class TelemetryTab(QtGui.QWidget):
         if self.plotting:
             x = update[0]/1000.0
             y = update[1]/1000.0
-            self.telemetryPlotData.append((x, y, update[3]))
-            now = datetime.now()
-            while len(self.telemetryPlotData) > 0 and \
-                        (now - self.telemetryPlotData[0][2]).total_seconds() > self.plotHistoryS:
-                self.telemetryPlotData.pop(0)
-            self.telemetryPlot.setData([d[0] for d in self.telemetryPlotData], [d[1] for d in self.telemetryPlotData])
+            if self.telemetryStore is not None:
+                for times, values in self.telemetryStore['pose'].tail(self.plotRow):
+                    self.telemetryPlotData.extend(times, values[0]/1000.0, values[1]/1000.0)
+                    self.plotRow += len(times)
+            else:
+                self.telemetryPlotData.append(monotonic(), x, y)
+            self.telemetryPlotData.trim(monotonic() - self.plotHistoryS)
+            self.telemetryPlot.setData(self.telemetryPlotData.x(), self.telemetryPlotData.y())
             
             self.orientationPlot.clear()
             self.orientationPlot.setData([x,x+0.1*math.cos(r)],[y,y+0.1*math.sin(r)])
         
+    def setTelemetryStore(self, store):
+        self.telemetryStore = store
+        self.clearPlotData()
+        
+    # plot starts over from the next sample
+    def clearPlotData(self):
+        self.telemetryPlotData.clear()
+        if self.telemetryStore is not None:
+            self.plotRow = len(self.telemetryStore['pose'])
+        
     def resetDefault(self):
         self.setupDefaultValues()
         self.telemetryPlot.clear()
         self.orientationPlot.clear()
-        self.telemetryPlotData = []
+        self.clearPlotData()
         
     def setupDefaultValues(self):
         self.statsXEdit.setText("?")
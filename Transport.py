@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+
+import errno
+import threading
+import time
+import Queue
+from datetime import datetime
+
+from Logger import Logger
+from LineFramer import LineFramer
+from Monotonic import monotonic
+from Poller import Poller
+from WakeupQueue import WakeupQueue
+
+class MarkedMessage(object):
+###
+# One received line, shared by all transports
+# timestamp is the wall clock arrival time (datetime) for display,
+# arrived the same moment on the monotonic clock for latency measurement
+###
+    __slots__ = ('payload', 'timestamp', 'arrived')
+    
+    def __init__(self, payload, timestamp=None, arrived=None):
+        self.payload = payload
+        self.timestamp = timestamp
+        self.arrived = arrived
+
+class Transport:
+###
+# One robot link served by the shared TransportLoop
+# outgoing means going from PC to robot, must be a WakeupQueue
+# incomming means going from robot to PC, anything with put()
+#
+# Subclasses provide fileno/_read/_write/_close. fileno() returning None
+# means the device cannot be polled, then _readBlocking is run on a
+# helper thread and the data is handed over to the loop.
+# _read/_write return None when the call would block.
+#
+# onClosed(transport, reason) is called on the loop thread as soon as the
+# link fails, it is not called when the link is stopped with join()
+###
+    name = "Link"
+    messageType = MarkedMessage
+    
+    def __init__(self, outgoing_q, incomming_q):
+        self.outgoing = outgoing_q
+        self.incomming = incomming_q
+        self._loop = TransportLoop.getInstance()
+        self._framer = LineFramer()
+        self._outbuffer = ''
+        self._alive = threading.Event()
+        self._commands = 0
+        self._writes = 0
+        self._bytesSent = 0
+        self.onClosed = None
+        self.startedAt = None
+        self.lastReceived = None
+        self.failedAt = None
+        
+    def start(self):
+        self.startedAt = time.time()
+        self._alive.set()
+        self._loop.add(self)
+        
+    def isAlive(self):
+        return self._alive.isSet()
+        
+    def join(self, timeout=None):
+        if self._alive.isSet():
+            self._alive.clear()
+            self._loop.remove(self, timeout)
+        self._close()
+        
+    def fileno(self):
+        return None
+        
+    def counters(self):
+        return {'commands': self._commands, 'writes': self._writes, 'bytesSent': self._bytesSent,
+            'writesPerCommand': float(self._writes) / self._commands if self._commands else 0.0}
+        
+    def _readBlocking(self):
+        raise NotImplementedError
+        
+    # methods below are called on the loop thread only
+    def _received(self, data, timestamp, arrived):
+        self.lastReceived = time.time()
+        # read once, the GUI thread may set it to None at any moment
+        capture = self._loop.capture
+        if capture is not None:
+            capture.received(self, data, arrived)
+        for line in self._framer.feed(data):
+            # handlers run on this thread, one failing must not stop the loop
+            try:
+                self.incomming.put(self.messageType(line, timestamp, arrived))
+            except Exception as e:
+                Logger.getInstance().error("%s failed to handle %r: %s" % (self.name, line, str(e)))
+            
+    def _onReadable(self, timestamp, arrived):
+        try:
+            data = self._read()
+        except Exception as e:
+            self._fail("receiving", e)
+        else:
+            if data == '':
+                self._fail("receiving", "connection closed by remote host")
+            elif data:
+                self._received(data, timestamp, arrived)
+            
+    def _onOutgoing(self):
+        self.outgoing.clearWakeup()
+        # while the link is busy commands wait in the queue, where they can be reordered
+        if not self._outbuffer or self.fileno() is None:
+            self._flush()
+        
+    def _onWritable(self):
+        self._flush()
+        
+    def _takeOutgoing(self):
+        # take everything that is queued, so a burst of commands goes out in one write
+        pending = []
+        while True:
+            try:
+                data = self.outgoing.get_nowait()
+            except Queue.Empty:
+                break
+            if data:
+                pending.append(data)
+        self._commands += len(pending)
+        self._outbuffer = ''.join(pending)
+        
+    def _flush(self):
+        while True:
+            if not self._outbuffer:
+                self._takeOutgoing()
+                if not self._outbuffer:
+                    break
+            try:
+                send = self._write(self._outbuffer)
+            except Exception as e:
+                self._fail("sending", e)
+                return
+            self._writes += 1
+            if send:
+                capture = self._loop.capture
+                if capture is not None:
+                    capture.sent(self, self._outbuffer[:send])
+                self._bytesSent += send
+                self._outbuffer = self._outbuffer[send:]
+            if self._outbuffer:
+                break
+        self._loop._setWriteInterest(self, len(self._outbuffer) > 0)
+        
+    def _feedLoop(self):
+        while self._alive.isSet():
+            try:
+                data = self._readBlocking()
+            except Exception as e:
+                if self._alive.isSet():
+                    self._loop.call(self._fail, "receiving", e)
+                break
+            if data:
+                self._loop.call(self._received, data, datetime.now(), monotonic())
+            
+    def _fail(self, action, reason):
+        if not self._alive.isSet():
+            return
+        self.failedAt = time.time()
+        Logger.getInstance().error("%s error while %s: %s" % (self.name, action, str(reason)))
+        self._alive.clear()
+        self._loop._detach(self)
+        self._close()
+        if self.onClosed:
+            self.onClosed(self, "%s: %s" % (action, str(reason)))
+        
+class TransportLoop(threading.Thread):
+###
+# Single I/O thread serving every Transport
+# Sleeps in epoll/select until a link is readable/writable, outgoing
+# queue of a link gets data, or another thread posts a call()
+# With capture set (LinkCapture) all traffic of all links is recorded
+# A link whose handler raises is failed, the others go on. A failing
+# poll() is reported once, links with descriptors that cannot be polled
+# any more are failed and the next poll waits POLL_RETRY seconds.
+###
+    POLL_RETRY = 0.1
+    _instance = None
+    _instanceLock = threading.Lock()
+    
+    @staticmethod
+    def getInstance():
+        with TransportLoop._instanceLock:
+            if TransportLoop._instance is None:
+                TransportLoop._instance = TransportLoop()
+                TransportLoop._instance.start()
+            return TransportLoop._instance
+    
+    def __init__(self):
+        super(TransportLoop, self).__init__(name="TransportLoop")
+        self.daemon = True
+        self._calls = WakeupQueue()
+        self._poller = Poller()
+        self._poller.register(self._calls.fileno())
+        self._links = {}   # fd -> transport
+        self._queues = {}  # outgoing queue fd -> transport
+        self._feeders = {} # transport -> thread, for links without fileno
+        self.capture = None
+        
+    def call(self, function, *args):
+        self._calls.put((function, args))
+        
+    def add(self, transport):
+        self.call(self._attach, transport)
+        
+    def remove(self, transport, timeout=None):
+        if threading.current_thread() is self:
+            self._detach(transport)
+            return
+        done = threading.Event()
+        self.call(self._detach, transport, done.set)
+        done.wait(timeout)
+        
+    def run(self):
+        callsfd = self._calls.fileno()
+        failing = False
+        while True:
+            try:
+                readable, writable, exceptional = self._poller.poll()
+            except Exception as e:
+                if getattr(e, 'errno', None) == errno.EINTR:
+                    continue
+                if not failing:
+                    Logger.getInstance().error("Transport loop poll exception " + str(e))
+                    failing = True
+                self._dropBroken(e)
+                time.sleep(self.POLL_RETRY)
+                continue
+            failing = False
+                
+            timestamp = datetime.now()
+            arrived = monotonic()
+            for fd in readable:
+                if fd == callsfd:
+                    try:
+                        self._runCalls()
+                    except Exception as e:
+                        Logger.getInstance().error("Transport loop calls failed: " + str(e))
+                elif fd in self._links:
+                    link = self._links[fd]
+                    self._serve(link, "receiving", link._onReadable, timestamp, arrived)
+                elif fd in self._queues:
+                    link = self._queues[fd]
+                    self._serve(link, "sending", link._onOutgoing)
+            for fd in writable:
+                if fd in self._links:
+                    link = self._links[fd]
+                    self._serve(link, "sending", link._onWritable)
+            for fd in exceptional:
+                if fd in self._links:
+                    link = self._links[fd]
+                    self._serve(link, "polling", link._fail, "polling", "exceptional condition")
+                    
+    # runs a handler of one link, whatever it raises fails that link only
+    def _serve(self, transport, action, handler, *args):
+        try:
+            handler(*args)
+        except Exception as e:
+            try:
+                transport._fail(action, e)
+            except Exception as e:
+                Logger.getInstance().error("Transport loop failed to close %s: %s" % (transport.name, str(e)))
+            self._detach(transport)
+            
+    def _dropBroken(self, reason):
+        for fd in self._poller.broken():
+            transport = self._links.get(fd) or self._queues.get(fd)
+            if fd == self._calls.fileno():
+                continue
+            if transport is None:
+                self._poller.unregister(fd)
+            else:
+                self._serve(transport, "polling", transport._fail, "polling", reason)
+                self._detach(transport)
+                
+    def _runCalls(self):
+        self._calls.clearWakeup()
+        while True:
+            try:
+                function, args = self._calls.get_nowait()
+            except Queue.Empty:
+                break
+            try:
+                function(*args)
+            except Exception as e:
+                Logger.getInstance().error("Transport loop call failed: " + str(e))
+            
+    def _attach(self, transport):
+        fd = transport.fileno()
+        if fd is None:
+            feeder = threading.Thread(target=transport._feedLoop, name=transport.name + "Reader")
+            feeder.daemon = True
+            self._feeders[transport] = feeder
+            feeder.start()
+        else:
+            self._links[fd] = transport
+            self._poller.register(fd)
+        qfd = transport.outgoing.fileno()
+        self._queues[qfd] = transport
+        self._poller.register(qfd)
+        transport._flush()
+        
+    def _detach(self, transport, done=None):
+        for fd, t in self._links.items():
+            if t is transport:
+                del self._links[fd]
+                self._poller.unregister(fd)
+        for fd, t in self._queues.items():
+            if t is transport:
+                del self._queues[fd]
+                self._poller.unregister(fd)
+        self._feeders.pop(transport, None)
+        if done:
+            done()
+            
+    def _setWriteInterest(self, transport, write):
+        fd = transport.fileno()
+        if fd in self._links:
+            self._poller.modify(fd, write)
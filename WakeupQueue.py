@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+
+import socket
+import Queue
+
+def _socketpair():
+    try:
+        return socket.socketpair()
+    except AttributeError: # windows, emulate with loopback connection
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(('127.0.0.1', 0))
+        server.listen(1)
+        client = socket.create_connection(server.getsockname())
+        conn, _ = server.accept()
+        server.close()
+        return conn, client
+
+class WakeupQueue(Queue.Queue):
+###
+# Queue.Queue which can be waited on with select/poll next to sockets
+# Every put makes fileno() readable, consumer must call clearWakeup()
+# BEFORE draining the queue so that no wakeup is ever lost
+###
+    def __init__(self, maxsize=0):
+        Queue.Queue.__init__(self, maxsize)
+        self._rsock, self._wsock = _socketpair()
+        self._rsock.setblocking(0)
+        self._wsock.setblocking(0)
+        self._signalled = False
+
+    def fileno(self):
+        return self._rsock.fileno()
+
+    def wakeup(self):
+        if not self._signalled:
+            self._signalled = True
+            try:
+                self._wsock.send('\0')
+            except socket.error: # buffer full, reader is already woken up
+                pass
+
+    # under the mutex, so no put() can slip in between draining the socket
+    # and resetting the flag and leave the queue non-empty without a wakeup
+    def clearWakeup(self):
+        with self.mutex:
+            try:
+                self._rsock.recv(4096)
+            except socket.error:
+                pass
+            self._signalled = False
+
+    def _put(self, item):
+        Queue.Queue._put(self, item)
+        self.wakeup()
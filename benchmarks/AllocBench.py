@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+###
+# Memory and allocation cost of the objects created per incomming line
+#   footprint - bytes and gc tracked objects of N retained messages/payloads,
+#               legacy __dict__ classes vs the __slots__ ones
+#   dispatch  - time per line, and objects and bytes per line that handlers
+#               keeping every payload they get end up holding, legacy path
+#               (HandlerResult list + Payload per handler) vs the current
+#               one reusing a single Payload
+# tracemalloc does not exist for Python 2, objects are counted with the gc
+# module and sized with sys.getsizeof instead.
+# Run from repository root: python -m benchmarks.AllocBench
+###
+
+import argparse
+import gc
+import sys
+import time
+from datetime import datetime
+
+from MsgDispatcher import MsgDispatcher
+from Transport import MarkedMessage
+import MsgDispatcher as dispatcherModule
+
+from benchmarks.DispatchBench import RULES, MESSAGES
+
+class LegacyMessage:
+    def __init__(self, payload, timestamp=None):
+        self.payload = payload
+        self.timestamp = timestamp
+
+class LegacyPayload:
+    def __init__(self, message, match, time=None):
+        self.message = message
+        self.match = match
+        self.timestamp = time
+        
+class LegacyHandlerResult:
+    def __init__(self, handler, match):
+        self.handler = handler
+        self.match = match
+
+class LegacyDispatcher(MsgDispatcher):
+    def dispatch(self, message):
+        if self.prompt and message.payload[0:self.lprompt] == self.prompt:
+            msg = message.payload[self.lprompt:]
+        else:
+            msg = message.payload
+        if len(msg) > 0:
+            handlers = []
+            for rule in self.candidates(msg):
+                match = rule.regex_c.match(msg)
+                if match:
+                    handlers.append(LegacyHandlerResult(rule.handler, match))
+            if len(handlers) == 0:
+                handlers.append(LegacyHandlerResult(self.default_handler, None))
+            if self.all_handler:
+                handlers.append(LegacyHandlerResult(self.all_handler, None))
+            for h in handlers:
+                h.handler(LegacyPayload(msg, h.match, message.timestamp))
+
+def sizeof(obj):
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+def footprint(factory, count):
+    gc.collect()
+    before = len(gc.get_objects())
+    items = [factory() for _ in xrange(count)]
+    objects = len(gc.get_objects()) - before - 1
+    return float(sum(sizeof(item) for item in items)) / count, float(objects) / count
+
+def build(dispatcherType, kept):
+    dispatcher = dispatcherType("odin>")
+    keep = lambda payload: kept.append(payload)
+    dispatcher.register_all(keep)
+    dispatcher.register_default(keep)
+    for regex in RULES:
+        dispatcher.register(regex, keep)
+    return dispatcher
+
+def allocations(dispatcherType, messageType, count):
+    # handlers keep every payload they get, shared ones are counted once
+    kept = []
+    dispatcher = build(dispatcherType, kept)
+    now = datetime.now()
+    gc.collect()
+    gc.disable()
+    before = len(gc.get_objects())
+    messages = [messageType(MESSAGES[i % len(MESSAGES)], now) for i in xrange(count)]
+    for m in messages:
+        dispatcher.dispatch(m)
+    unique = dict((id(p), p) for p in kept)
+    objects = len(gc.get_objects()) - before - 2
+    size = sum(sizeof(p) for p in unique.itervalues()) + sum(sizeof(m) for m in messages)
+    gc.enable()
+    return float(objects) / count, float(size) / count
+
+def speed(dispatcherType, messageType, rounds):
+    dispatcher = build(dispatcherType, [])
+    dispatcher.all_handler = dispatcher.default_handler = lambda payload: None
+    for rule in dispatcher.dispatch_rules:
+        rule.handler = dispatcher.default_handler
+    now = datetime.now()
+    lines = MESSAGES * rounds
+    start = time.time()
+    for line in lines:
+        dispatcher.dispatch(messageType(line, now))
+    return (time.time() - start) / len(lines)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--rounds', type=int, default=20000)
+    args = parser.parse_args()
+    
+    print "footprint of one retained object"
+    print "%-16s %10s %10s" % ("type", "bytes", "objects")
+    for name, factory in (("TCPMarkedMessage", lambda: LegacyMessage("odin>[Tel] X: 1.0 Y: 2.0 O: 3.0")),
+            ("MarkedMessage", lambda: MarkedMessage("odin>[Tel] X: 1.0 Y: 2.0 O: 3.0")),
+            ("Payload legacy", lambda: LegacyPayload("[Tel]", None)),
+            ("Payload", lambda: dispatcherModule.Payload("[Tel]", None))):
+        size, objects = footprint(factory, args.count)
+        print "%-16s %10.1f %10.2f" % (name, size, objects)
+        
+    print
+    print "dispatch, per line (message included)"
+    print "%-8s %10s %10s %10s" % ("path", "objects", "bytes", "time")
+    for name, dispatcherType, messageType in (("legacy", LegacyDispatcher, LegacyMessage), ("current", MsgDispatcher, MarkedMessage)):
+        objects, size = allocations(dispatcherType, messageType, args.count)
+        seconds = speed(dispatcherType, messageType, args.rounds)
+        print "%-8s %10.2f %10.1f %8.2fus" % (name, objects, size, seconds*1e6)
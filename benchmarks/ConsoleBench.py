@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+###
+# Comm console cost at a given line rate, lines arrive as batches of
+# rate*frame lines joined by '\n', as IncommingMessageHandler delivers them
+#   ring      - LineRing append of every batch and fetch of the visible rows
+#               (what QRingConsole does per frame), headless
+#   filtered  - the same with a filter matching ~1/10 of the lines
+#   find      - LineRing.find of a missing text over a full buffer
+# With --widget (needs PyQt4 and a display) the GUI thread time of the
+# previous QPlainTextEdit, one appendPlainText per line, is compared with
+# QRingConsole fed one block per frame, events processed after each frame.
+# Run from repository root: python -m benchmarks.ConsoleBench --rate 20000
+###
+
+import argparse
+import time
+
+from LineRing import LineRing
+from RobotSimulator import RobotSimulator
+
+def batches(rate, frame, seconds):
+    simulator = RobotSimulator(seed=1)
+    perFrame = max(1, int(rate * frame))
+    lines = [simulator.randomLine() for _ in xrange(perFrame)]
+    return ["\n".join(lines)] * int(seconds / frame)
+
+def ringLoad(blocks, capacity, rows, filter=None):
+    ring = LineRing(capacity)
+    ring.setFilter(filter)
+    start = time.time()
+    for block in blocks:
+        ring.append(block.split('\n'))
+        ring.rowLines(ring.rows() - rows, ring.rows())
+    return time.time() - start, ring
+
+def widgetLoad(blocks, capacity):
+    from PyQt4 import QtGui
+    from QRingConsole import QRingConsole
+    app = QtGui.QApplication.instance() or QtGui.QApplication([])
+    legacy = QtGui.QPlainTextEdit()
+    legacy.setReadOnly(True)
+    legacy.setMaximumBlockCount(500)
+    legacy.show()
+    console = QRingConsole(capacity)
+    console.show()
+    app.processEvents()
+
+    start = time.time()
+    for block in blocks:
+        for line in block.split('\n'):
+            legacy.appendPlainText(line)
+        app.processEvents()
+    legacyTime = time.time() - start
+
+    start = time.time()
+    for block in blocks:
+        console.appendPlainText(block)
+        console._refresh() # as the frame timer would, once per block
+        app.processEvents()
+    return legacyTime, time.time() - start
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rate', type=float, default=20000.0, help="lines per second")
+    parser.add_argument('--seconds', type=float, default=5.0, help="simulated traffic duration")
+    parser.add_argument('--frame', type=float, default=0.016, help="batch period in seconds")
+    parser.add_argument('--capacity', type=int, default=100000)
+    parser.add_argument('--rows', type=int, default=40, help="visible rows")
+    parser.add_argument('--widget', action='store_true', help="also measure the Qt widgets")
+    args = parser.parse_args()
+
+    blocks = batches(args.rate, args.frame, args.seconds)
+    lines = len(blocks) * (blocks[0].count('\n') + 1)
+    print "%d lines in %d frames, %.0f lines/s" % (lines, len(blocks), lines / args.seconds)
+    print "%-10s %10s %10s %12s" % ("case", "per line", "per frame", "load @rate")
+    for name, filter in (("ring", None), ("filtered", "Speed")):
+        spent, ring = ringLoad(blocks, args.capacity, args.rows, filter)
+        print "%-10s %8.2fus %8.3fms %11.1f%%" % (name, spent / lines * 1e6, spent / len(blocks) * 1e3, spent / args.seconds * 100)
+    start = time.time()
+    ring.setFilter(None)
+    ring.find("no such text", 0)
+    print "%-10s %10s %8.3fms  over %d lines" % ("find", "", (time.time() - start) * 1e3, len(ring))
+
+    if args.widget:
+        legacyTime, consoleTime = widgetLoad(blocks, args.capacity)
+        print "QPlainTextEdit %.1f%% of GUI thread, QRingConsole %.1f%%" % (legacyTime / args.seconds * 100, consoleTime / args.seconds * 100)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+###
+# MsgDispatcher cost per message as the number of registered rules grows
+# Compares the prefix indexed dispatcher with a linear scan over all rules,
+# and the indexed one with per rule instrumentation on
+# Run from repository root: python -m benchmarks.DispatchBench
+###
+
+import argparse
+import time
+
+from MsgDispatcher import MsgDispatcher
+
+class Message:
+    def __init__(self, payload, timestamp=None, arrived=None):
+        self.payload = payload
+        self.timestamp = timestamp
+        self.arrived = arrived
+
+class LinearDispatcher(MsgDispatcher):
+    def candidates(self, message):
+        return self.dispatch_rules
+
+RULES = [r"^Battery voltage: (\d+\.\d+)V$", r"^CPU usage: (.*)$", r"^Available memory: (\d+)kB$",
+    r"^\[Tel\] X: (-?\d+.\d+) Y: (-?\d+.\d+) O: (-?\d+.\d+)$", r"^\[Speed\] L: (-?\d+.\d+) R: (-?\d+.\d+)$",
+    r"^Reset!$", r"^\[RC5\] Received (\d+)$", r"^\[Debug\] Radio test passed", r"^\[Camera\] (.+)"]
+
+MESSAGES = ["odin>[Tel] X: 1234.567 Y: -765.432 O: 89.123"] * 6 + ["odin>[Speed] L: 200.000 R: 240.000"] * 2 + \
+    ["odin>CPU usage: 12.50", "odin>[Camera] Radio: 1 2 3"]
+
+def build(dispatcherType, extra, instrumented=False):
+    dispatcher = dispatcherType("odin>")
+    dispatcher.instrumented = instrumented
+    nothing = lambda payload: None
+    dispatcher.register_all(nothing)
+    dispatcher.register_default(nothing)
+    for i in xrange(extra):
+        dispatcher.register(r"^\[Extra%d\] value: (\d+)$" % (i), nothing)
+    for regex in RULES:
+        dispatcher.register(regex, nothing)
+    return dispatcher
+
+def measure(dispatcher, rounds):
+    messages = [Message(m) for m in MESSAGES]
+    start = time.time()
+    for _ in xrange(rounds):
+        for m in messages:
+            dispatcher.dispatch(m)
+    return (time.time() - start) / (rounds * len(messages))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rounds', type=int, default=5000)
+    args = parser.parse_args()
+    
+    print "%8s %12s %12s %14s" % ("rules", "linear", "indexed", "instrumented")
+    for extra in (0, 10, 50, 200):
+        linear = measure(build(LinearDispatcher, extra), args.rounds)
+        indexed = measure(build(MsgDispatcher, extra), args.rounds)
+        instrumented = measure(build(MsgDispatcher, extra, True), args.rounds)
+        print "%8d %10.2fus %10.2fus %12.2fus" % (len(RULES) + extra, linear*1e6, indexed*1e6, instrumented*1e6)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+###
+# LineFramer against the former "_inbuffer += data; splitlines()" framing
+# Every burst is delivered in recv sized chunks, two traffic shapes:
+#   lines - robot log output, ~60 byte lines
+#   long  - one line as long as the whole burst (worst case for rescanning)
+# Run from repository root: python -m benchmarks.FramerBench
+###
+
+import argparse
+import time
+
+from LineFramer import LineFramer
+
+class LegacyFramer:
+    def __init__(self):
+        self._inbuffer = ''
+        
+    def feed(self, data):
+        self._inbuffer += data
+        splitted = self._inbuffer.splitlines()
+        if self._inbuffer.endswith('\n') or len(splitted) == 0:
+            self._inbuffer = ''
+        else:
+            self._inbuffer = splitted.pop()
+        return [line for line in splitted if len(line)]
+
+BURSTS = [64, 1024, 16*1024, 256*1024, 1024*1024]
+
+def makeBurst(shape, size):
+    if shape == 'long':
+        return 'x' * (size - 1) + '\n'
+    line = "odin>[Tel] X: 1234.567 Y: -765.432 O: 89.123456\r\n"
+    return (line * (size // len(line) + 1))[:size]
+
+def measure(framerType, burst, chunk, minTime):
+    chunks = [burst[i:i+chunk] for i in xrange(0, len(burst), chunk)]
+    framer = framerType()
+    rounds = 0
+    start = time.time()
+    while True:
+        for c in chunks:
+            framer.feed(c)
+        rounds += 1
+        elapsed = time.time() - start
+        if elapsed >= minTime:
+            return elapsed / rounds
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chunk', type=int, default=4096, help="bytes per recv")
+    parser.add_argument('--time', type=float, default=0.5, help="minimal time per measurement [s]")
+    args = parser.parse_args()
+    
+    print "%-6s %9s %14s %14s %8s" % ("shape", "burst", "legacy MB/s", "framer MB/s", "speedup")
+    for shape in ('lines', 'long'):
+        for size in BURSTS:
+            burst = makeBurst(shape, size)
+            legacy = measure(LegacyFramer, burst, args.chunk, args.time)
+            framer = measure(LineFramer, burst, args.chunk, args.time)
+            print "%-6s %9d %14.1f %14.1f %7.1fx" % (shape, size,
+                size / legacy / 1e6, size / framer / 1e6, legacy / framer)
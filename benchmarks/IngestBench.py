@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+###
+# End-to-end ingest benchmark: socket bytes -> Qt signal, headless
+# RobotSimulator floods a TCPClient, lines travel through LineFramer,
+# IncommingMessageHandler and MsgDispatcher on the transport thread and are
+# delivered as queued signals to a receiver in the main thread.
+#
+# Stages (p50/p99 per call, busy = share of wall time spent in the stage):
+#   read     - Transport._read, one call per chunk
+#   framing  - LineFramer.feed, one call per chunk
+#   queue    - arrival timestamp -> dispatch start, per line (rest of the chunk)
+#   dispatch - MsgDispatcher.dispatch, per line
+#   delivery - [Tel] arrival -> slot run in main thread, per line
+# events/s counts queued events the main thread had to process, with
+# --batch MS results are delivered in one batch per MS milliseconds, with
+# state streams conflated (delivery then counts only the samples shown)
+#
+# Run from repository root:
+#   python -m benchmarks.IngestBench --rate 20000 --output run.json
+#   python -m benchmarks.IngestBench --rate 20000 --compare run.json
+# With --compare the exit code is 1 when a regression is found.
+###
+
+import argparse
+import json
+import resource
+import sys
+import threading
+import time
+from datetime import datetime
+
+from PyQt4 import QtCore
+
+from IncommingMessageHandler import IncommingMessageHandler
+from OutgoingScheduler import OutgoingScheduler
+from RobotSimulator import RobotSimulator
+from TCPClient import TCPClient
+
+STAGES = ('read', 'framing', 'queue', 'dispatch', 'delivery')
+
+def cpuTime():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def percentile(ordered, p):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered)-1, int(p*len(ordered)))]
+
+def timed(function, samples):
+    def wrapper(*args):
+        start = time.time()
+        try:
+            return function(*args)
+        finally:
+            samples.append(time.time() - start)
+    return wrapper
+
+class Receiver(QtCore.QObject):
+    def __init__(self, samples, deliver):
+        super(Receiver, self).__init__()
+        self.deliver = deliver
+        self.lines = 0
+        self.events = 0
+        self.samples = samples
+        
+    @QtCore.pyqtSlot(str)
+    def incomming(self, message):
+        self.lines += message.count('\n') + 1
+        
+    @QtCore.pyqtSlot(object)
+    def batch(self, batch):
+        self.events += 1
+        self.deliver(batch)
+        
+    def count(self, *args):
+        self.events += 1
+        
+    @QtCore.pyqtSlot(tuple)
+    def telemetry(self, update):
+        self.samples.append((datetime.now() - update[3]).total_seconds())
+
+def run(args):
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication(sys.argv)
+    samples = dict((stage, []) for stage in STAGES)
+    
+    simulator = RobotSimulator(args.rate, args.mix, seed=1)
+    address = simulator.listenTCP(0)
+    simThread = threading.Thread(target=simulator.serve)
+    simThread.daemon = True
+    simThread.start()
+    
+    out_q = OutgoingScheduler()
+    handler = IncommingMessageHandler(args.batch / 1000.0)
+    dispatch = handler.dispatcher.dispatch
+    def queuedDispatch(message):
+        samples['queue'].append((datetime.now() - message.timestamp).total_seconds())
+        dispatch(message)
+    handler.dispatcher.dispatch = timed(queuedDispatch, samples['dispatch'])
+    handlerThread = QtCore.QThread()
+    handler.moveToThread(handlerThread)
+    handlerThread.started.connect(handler.start)
+    
+    receiver = Receiver(samples['delivery'], handler.deliver)
+    handler.incomming.connect(receiver.incomming)
+    handler.updTelemetry.connect(receiver.telemetry)
+    handler.batch.connect(receiver.batch)
+    if not args.batch:
+        for signal in (handler.incomming, handler.updTelemetry, handler.updCurrentSpeed, handler.updBatteryVoltage,
+            handler.updCpuUsage, handler.updMemUsage, handler.rc5Input, handler.cameraDebug):
+            signal.connect(receiver.count, QtCore.Qt.QueuedConnection)
+    handlerThread.start()
+    
+    client = TCPClient(address, out_q, handler)
+    client._read = timed(client._read, samples['read'])
+    client._framer.feed = timed(client._framer.feed, samples['framing'])
+    
+    measured = {}
+    def begin():
+        measured['lines'] = receiver.lines
+        measured['events'] = receiver.events
+        measured['sent'] = simulator.sent
+        measured['cpu'] = cpuTime()
+        measured['wall'] = time.time()
+        for stage in STAGES:
+            del samples[stage][:]
+    def end():
+        measured['lines'] = receiver.lines - measured['lines']
+        measured['events'] = receiver.events - measured['events']
+        measured['sent'] = simulator.sent - measured['sent']
+        measured['cpu'] = cpuTime() - measured['cpu']
+        measured['wall'] = time.time() - measured['wall']
+        app.quit()
+        
+    client.start()
+    QtCore.QTimer.singleShot(int(args.warmup*1000), begin)
+    QtCore.QTimer.singleShot(int((args.warmup + args.duration)*1000), end)
+    app.exec_()
+    
+    client.join()
+    simulator.stop()
+    handler.stop()
+    handlerThread.quit()
+    handlerThread.wait()
+    
+    wall = measured['wall']
+    result = {
+        'config': {'rate': args.rate, 'mix': args.mix, 'duration': args.duration, 'batchMs': args.batch},
+        'linesPerSecond': measured['lines'] / wall,
+        'eventsPerSecond': measured['events'] / wall,
+        'sentPerSecond': measured['sent'] / wall,
+        'cpuPercent': 100.0 * measured['cpu'] / wall,
+        'conflated': handler.conflationStats(),
+        'latency': handler.latency.report(),
+        'stages': {},
+    }
+    for stage in STAGES:
+        ordered = sorted(samples[stage])
+        result['stages'][stage] = {
+            'count': len(ordered),
+            'p50Us': percentile(ordered, 0.5) * 1e6,
+            'p99Us': percentile(ordered, 0.99) * 1e6,
+            'busyPercent': 100.0 * sum(ordered) / wall if stage in ('read', 'framing', 'dispatch') else None,
+        }
+    return result
+
+def report(result):
+    print "lines/s delivered: %.0f (simulator sent %.0f/s), process CPU %.1f%%" % (
+        result['linesPerSecond'], result['sentPerSecond'], result['cpuPercent'])
+    print "GUI thread events/s: %.0f, conflated state samples: %d" % (result['eventsPerSecond'], result['conflated']['total'])
+    print "hop latency (monotonic, sampled): " + ", ".join("%s p99 %.1fus" % (hop, result['latency'][hop]['p99']*1e6)
+        for hop in ('transport', 'dispatch', 'queue', 'apply', 'endToEnd') if result['latency'][hop]['window'])
+    print "%-9s %9s %11s %11s %7s" % ("stage", "count", "p50", "p99", "busy")
+    for stage in STAGES:
+        s = result['stages'][stage]
+        busy = "%6.1f%%" % s['busyPercent'] if s['busyPercent'] is not None else "      -"
+        print "%-9s %9d %9.1fus %9.1fus %s" % (stage, s['count'], s['p50Us'], s['p99Us'], busy)
+
+def compare(result, baseline, threshold):
+    regressions = []
+    def check(name, old, new, higherIsBetter):
+        change = (new - old) / old if old else 0.0
+        worse = change < -threshold if higherIsBetter else change > threshold
+        print "%-22s %12.1f %12.1f %+8.1f%% %s" % (name, old, new, change*100.0, "REGRESSION" if worse else "")
+        if worse:
+            regressions.append(name)
+    print "%-22s %12s %12s %9s" % ("metric", "baseline", "current", "change")
+    check("lines/s", baseline['linesPerSecond'], result['linesPerSecond'], True)
+    check("cpu %", baseline['cpuPercent'], result['cpuPercent'], False)
+    for stage in STAGES:
+        for key in ('p50Us', 'p99Us'):
+            check("%s %s" % (stage, key), baseline['stages'][stage][key], result['stages'][stage][key], False)
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rate', type=float, default=20000.0, help="simulator lines per second")
+    parser.add_argument('--mix', default="tel=60,speed=20,battery=3,cpu=3,memory=3,camera=8,rc5=3")
+    parser.add_argument('--duration', type=float, default=10.0, help="measured time [s]")
+    parser.add_argument('--warmup', type=float, default=1.0, help="time before measurement starts [s]")
+    parser.add_argument('--batch', type=float, default=0.0, help="batch delivery period [ms], 0 emits per message")
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--compare', help="baseline JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.1, help="relative change treated as regression")
+    args = parser.parse_args()
+    
+    result = run(args)
+    report(result)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            print "%d regression(s): %s" % (len(regressions), ", ".join(regressions))
+            sys.exit(1)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+###
+# Time to make a large log file browsable with LogIndex / LogModel
+#   index     - cold scan of the whole file (no cache)
+#   cache     - reopen, index loaded from <path>.idx.npz
+#   append    - 1 MB appended, incremental scan of the new part only
+#   seek      - line at a given time, searchsorted
+#   level     - rows at WARN or above over the whole file
+#   find      - text present only in the last line, mmap.find
+# The file is generated in a temporary directory (or --path) and removed.
+# Run from repository root: python -m benchmarks.LogIndexBench --megabytes 1024
+###
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from LogIndex import LogIndex, LogModel
+
+LEVELS = ["LOG  ", "DEBUG", "INFO ", "WARN ", "ERROR"]
+
+def generate(path, megabytes, start, mode='w'):
+    rand = random.Random(1)
+    now = start
+    size = 0
+    with open(path, mode) as f:
+        while size < megabytes * 1024 * 1024:
+            lines = []
+            for _ in xrange(10000):
+                now += timedelta(microseconds=rand.randint(100, 5000))
+                lines.append("%s %s: X: %.5f Y: %.5f O: %.7f rad" % (now, rand.choice(LEVELS),
+                    rand.uniform(-1000, 1000), rand.uniform(-1000, 1000), rand.uniform(-3, 3)))
+            block = "\n".join(lines) + "\n"
+            f.write(block)
+            size += len(block)
+    return now
+
+def timed(function, *args):
+    start = time.time()
+    result = function(*args)
+    return time.time() - start, result
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--megabytes', type=int, default=256)
+    parser.add_argument('--path', default=None, help="log file to generate")
+    args = parser.parse_args()
+
+    directory = None
+    if args.path is None:
+        directory = tempfile.mkdtemp(prefix="odin-logindex-")
+        args.path = os.path.join(directory, "logFile.txt")
+    try:
+        start = datetime(2016, 5, 1, 12, 0, 0)
+        end = generate(args.path, args.megabytes, start)
+        with open(args.path, 'a') as f:
+            f.write("%s ERROR: needle\n" % (end))
+        size = os.path.getsize(args.path)
+
+        index = LogIndex(args.path)
+        spent, _ = timed(index.run)
+        print "%-8s %8.2fs  %d lines, %.0f MB/s" % ("index", spent, len(index), size / spent / 1024 / 1024)
+
+        spent, index = timed(LogIndex, args.path)
+        print "%-8s %8.2fs  %d lines" % ("cache", spent, index.fromCache)
+
+        generate(args.path, 1, end, 'a')
+        spent, _ = timed(index.run)
+        print "%-8s %8.3fs  %d lines" % ("append", spent, len(index) - index.fromCache)
+
+        model = LogModel(index)
+        spent, row = timed(model.rowAt, start + (end - start) / 2)
+        print "%-8s %8.3fms row %d" % ("seek", spent * 1e3, row)
+        spent, _ = timed(model.setLevel, 30)
+        print "%-8s %8.3fs  %d rows" % ("level", spent, model.rows())
+        model.setLevel(0)
+        spent, row = timed(model.find, "needle", 0)
+        print "%-8s %8.3fs  row %d" % ("find", spent, row)
+    finally:
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+        else:
+            os.remove(args.path + ".idx.npz")
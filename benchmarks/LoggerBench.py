@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+###
+# Cost of the per frame camera pose debug line, at 188 fps camera rate
+#   eager    - message formatted by the caller, put() always (previous code)
+#   gated    - template + args, camera source below threshold, nothing done
+#   floor    - template + args, nobody takes DEBUG at all, one comparison
+#   enabled  - template + args, camera source at DEBUG, formatted and emitted
+# A no-op sink and no console receiver are used, so only the Logger is timed.
+# Run from repository root: python -m benchmarks.LoggerBench
+###
+
+import argparse
+import time
+
+from Logger import Logger
+
+FPS = 188
+TELEMETRY = (1234.56789, -765.43210, 1.2345678)
+
+def eager(logger):
+    logger.put(Logger.DEBUG, "X: %.5f Y: %.5f O: %.7f rad" % TELEMETRY)
+
+def lazy(logger):
+    logger.debug("X: %.5f Y: %.5f O: %.7f rad", *TELEMETRY, source="camera")
+
+def measure(log, rounds):
+    logger = Logger.getInstance()
+    start = time.time()
+    for _ in xrange(rounds):
+        log(logger)
+    return (time.time() - start) / rounds
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rounds', type=int, default=200000)
+    args = parser.parse_args()
+
+    logger = Logger.getInstance()
+    sink = lambda line: None
+    logger.addSink(sink)
+
+    cases = [("eager", eager, Logger.DEBUG, Logger.DEBUG), ("gated", lazy, Logger.INFO, Logger.DEBUG),
+        ("floor", lazy, Logger.INFO, Logger.INFO), ("enabled", lazy, Logger.DEBUG, Logger.DEBUG)]
+    print "%-8s %10s %14s" % ("case", "per call", "per 1s @%dfps" % FPS)
+    for name, log, level, default in cases:
+        logger.setSourceLevel("camera", level)
+        logger.setLevel(default)
+        perCall = measure(log, args.rounds)
+        print "%-8s %8.2fus %12.3fms" % (name, perCall*1e6, perCall*FPS*1e3)
+    logger.setSourceLevel("camera", None)
+    logger.setLevel(Logger.DEBUG)
+    logger.removeSink(sink)
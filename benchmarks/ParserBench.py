@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+###
+# Cost of turning a hot telemetry line into values, per message type
+#   regex - re match, group() per field and float() each (previous handlers)
+#   fast  - FieldParser, one match and map() over groups()
+# "malformed" lines fail the match at the very end
+# Run from repository root: python -m benchmarks.ParserBench
+###
+
+import argparse
+import re
+import time
+
+from FieldParser import FieldParser
+
+TEL_REGEX = r"^\[Tel\] X: (-?\d+.\d+) Y: (-?\d+.\d+) O: (-?\d+.\d+)$"
+SPEED_REGEX = r"^\[Speed\] L: (-?\d+.\d+) R: (-?\d+.\d+)$"
+
+CASES = [
+    ("tel", "[Tel] X: 1234.567 Y: -765.432 O: 89.123", TEL_REGEX),
+    ("speed", "[Speed] L: 200.000 R: -240.000", SPEED_REGEX),
+    ("tel malformed", "[Tel] X: 1234.567 Y: -765.432 O: 89.123 ", TEL_REGEX),
+]
+
+def regexParse(regex_c, message):
+    match = regex_c.match(message)
+    if match:
+        return tuple(float(match.group(i)) for i in xrange(1, regex_c.groups + 1))
+
+def measure(parse, message, rounds):
+    start = time.time()
+    for _ in xrange(rounds):
+        parse(message)
+    return (time.time() - start) / rounds
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rounds', type=int, default=200000)
+    args = parser.parse_args()
+    
+    print "%-14s %10s %10s %8s" % ("message", "regex", "fast", "speedup")
+    for name, message, regex in CASES:
+        regex_c = re.compile(regex)
+        fast = FieldParser(regex)
+        assert fast(message) == regexParse(regex_c, message)
+        slow = measure(lambda m: regexParse(regex_c, m), message, args.rounds)
+        quick = measure(fast, message, args.rounds)
+        print "%-14s %8.2fus %8.2fus %7.2fx" % (name, slow*1e6, quick*1e6, slow/quick)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+###
+# Per sample cost of keeping the telemetry XY plot history for a time window
+#   list    - list append, pop(0) of expired samples and two new lists for
+#             setData (previous TelemetryTab code)
+#   store   - TelemetryStore 'pose' append (done by the dispatcher anyway),
+#             new rows read with tail(), scaled to metres and added to
+#             PlotHistory, searchsorted trim and x()/y() views
+#             (TelemetryTab code)
+# Measured in steady state, window already full, for several window lengths
+# (plotLimitTime), setData itself is not included.
+# Run from repository root: python -m benchmarks.PlotHistoryBench --rate 100
+###
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from PlotHistory import PlotHistory
+from TelemetryStore import TelemetryStore
+
+def legacy(data, samples, history):
+    for x, y, stamp, _ in samples:
+        data.append((x / 1000.0, y / 1000.0, stamp))
+        while len(data) > 0 and (stamp - data[0][2]).total_seconds() > history:
+            data.pop(0)
+        xs, ys = [d[0] for d in data], [d[1] for d in data]
+
+def current(state, samples, history):
+    pose, plot, seen = state
+    for x, y, _, t in samples:
+        pose.append(t, (x, y, 0.0))
+        for times, values in pose.tail(seen):
+            plot.extend(times, values[0] / 1000.0, values[1] / 1000.0)
+            seen += len(times)
+        plot.trim(t - history)
+        xs, ys = plot.x(), plot.y()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rate', type=float, default=100.0, help="samples per second")
+    parser.add_argument('--samples', type=int, default=2000, help="measured samples after the window fills")
+    parser.add_argument('--windows', default="10,60,300,1200", help="history lengths in seconds")
+    args = parser.parse_args()
+
+    print "%8s %8s %10s %10s %8s" % ("window", "samples", "list", "store", "speedup")
+    begin = datetime(2016, 5, 1, 12, 0, 0)
+    for window in [float(w) for w in args.windows.split(',')]:
+        filled = int(window * args.rate)
+        samples = [(i * 1.0, -i * 1.0, begin + timedelta(seconds=i / args.rate), i / args.rate)
+            for i in xrange(filled + args.samples)]
+        store = TelemetryStore()
+        try:
+            pose = store['pose']
+            for x, y, _, t in samples[:filled]:
+                pose.append(t, (x, y, 0.0))
+            history = [(x / 1000.0, y / 1000.0, stamp) for x, y, stamp, _ in samples[:filled]]
+            plot = PlotHistory()
+            for times, values in pose.tail(0):
+                plot.extend(times, values[0] / 1000.0, values[1] / 1000.0)
+            results = []
+            for function, data in ((legacy, history), (current, (pose, plot, len(pose)))):
+                start = time.time()
+                function(data, samples[filled:], window)
+                results.append((time.time() - start) / args.samples)
+        finally:
+            store.close()
+        print "%7.0fs %8d %8.2fus %8.2fus %7.1fx" % (window, filled, results[0]*1e6, results[1]*1e6, results[0]/results[1])
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+###
+# Replays a link capture through LineFramer -> IncommingMessageHandler ->
+# MsgDispatcher, no robot or network needed, and reports ingest throughput
+# and the busiest dispatcher rules. Without a capture file a synthetic one
+# is recorded first from RobotSimulator lines.
+# Run from repository root:
+#   python -m benchmarks.ReplayBench session.odincap
+#   python -m benchmarks.ReplayBench --lines 200000 --rate 20000
+#   python -m benchmarks.ReplayBench session.odincap --realtime --speed 2
+###
+
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+from IncommingMessageHandler import IncommingMessageHandler
+from LinkCapture import LinkCapture, replay
+from RobotSimulator import RobotSimulator, PROMPT
+
+class SyntheticLink:
+    name = "TCP"
+
+def cpuTime():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+# lines at rate lines/s, sent in chunks of up to 4 kB as a socket would deliver them
+def record(path, lines, rate, seed=1):
+    simulator = RobotSimulator(rate, seed=seed)
+    capture = LinkCapture(path)
+    link = SyntheticLink()
+    t = 0.0
+    chunk = []
+    size = 0
+    for i in xrange(lines):
+        line = PROMPT + simulator.randomLine() + "\r\n"
+        chunk.append(line)
+        size += len(line)
+        if size >= 4096 or i == lines - 1:
+            capture.received(link, ''.join(chunk), t)
+            chunk, size = [], 0
+        t += 1.0 / rate
+    capture.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('capture', nargs='?', help="capture file, synthetic when omitted")
+    parser.add_argument('--lines', type=int, default=100000, help="lines of the synthetic capture")
+    parser.add_argument('--rate', type=float, default=20000.0, help="lines/s of the synthetic capture")
+    parser.add_argument('--realtime', action='store_true', help="keep recorded pacing")
+    parser.add_argument('--speed', type=float, default=1.0, help="pacing multiplier with --realtime")
+    parser.add_argument('--top', type=int, default=5, help="rules shown")
+    args = parser.parse_args()
+    
+    path = args.capture
+    if path is None:
+        handle, path = tempfile.mkstemp(suffix=".odincap")
+        os.close(handle)
+        record(path, args.lines, args.rate)
+        
+    handler = IncommingMessageHandler()
+    wall, cpu = time.time(), cpuTime()
+    lines = replay(path, handler, args.realtime, args.speed)
+    wall, cpu = time.time() - wall, cpuTime() - cpu
+    
+    if args.capture is None:
+        os.remove(path)
+    print "%d lines in %.2fs: %.0f lines/s, %.1fus CPU per line" % (lines, wall, lines / wall, cpu / max(lines, 1) * 1e6)
+    latency = handler.latency.report()
+    print "dispatch p50/p99: %.1fus / %.1fus" % (latency['dispatch']['p50']*1e6, latency['dispatch']['p99']*1e6)
+    print "%-60s %9s %12s %12s" % ("rule", "hits", "match", "handler")
+    for rule in sorted(handler.dispatcher.stats(), key=lambda r: r['match_time'] + r['handler_time'], reverse=True)[:args.top]:
+        print "%-60s %9d %10.1fms %10.1fms" % (rule['rule'][:60], rule['hits'], rule['match_time']*1e3, rule['handler_time']*1e3)
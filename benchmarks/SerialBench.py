@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+###
+# Throughput, latency and idle CPU of the serial engine (COMClient)
+# A Linux pty pair stands in for the robot: COMClient opens the slave end,
+# the benchmark plays the robot on the master end
+# Run from repository root: python -m benchmarks.SerialBench
+###
+
+import argparse
+import os
+import resource
+import time
+import tty
+import Queue
+
+from COMClient import COMClient
+from WakeupQueue import WakeupQueue
+
+LINE = "odin>[Tel] X: 1234.567 Y: -765.432 O: 89.123\n"
+
+def cpuTime():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered)-1, int(p*len(ordered)))]
+
+def readLine(fd):
+    data = ''
+    while not data.endswith('\n'):
+        data += os.read(fd, 256)
+    return data
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--baudrate', type=int, default=460800)
+    parser.add_argument('--idle', type=float, default=2.0, help="idle measurement time [s]")
+    parser.add_argument('--count', type=int, default=2000, help="messages for latency measurement")
+    parser.add_argument('--burst', type=int, default=100000, help="lines for throughput measurement")
+    args = parser.parse_args()
+    
+    master, slave = os.openpty()
+    tty.setraw(master)
+    out_q = WakeupQueue()
+    in_q = Queue.Queue()
+    client = COMClient(os.ttyname(slave), args.baudrate, out_q, in_q)
+    client.start()
+    
+    wall = time.time()
+    cpu = cpuTime()
+    time.sleep(args.idle)
+    print "idle CPU:           %8.1f%%" % (100.0 * (cpuTime() - cpu) / (time.time() - wall))
+    
+    rx = []
+    for i in xrange(args.count):
+        start = time.time()
+        os.write(master, LINE)
+        in_q.get(True)
+        rx.append(time.time() - start)
+    print "rx latency p50/p99: %8.1fus %8.1fus" % (percentile(rx, 0.5)*1e6, percentile(rx, 0.99)*1e6)
+    
+    tx = []
+    for i in xrange(args.count):
+        start = time.time()
+        out_q.put("telemetry raw\n")
+        readLine(master)
+        tx.append(time.time() - start)
+    print "tx latency p50/p99: %8.1fus %8.1fus" % (percentile(tx, 0.5)*1e6, percentile(tx, 0.99)*1e6)
+    
+    chunk = LINE * 256
+    wall = time.time()
+    cpu = cpuTime()
+    sent = 0
+    received = 0
+    while sent < args.burst:
+        os.write(master, chunk)
+        sent += 256
+        while not in_q.empty():
+            in_q.get_nowait()
+            received += 1
+    while received < sent:
+        in_q.get(True)
+        received += 1
+    elapsed = time.time() - wall
+    print "rx throughput:      %8.0f lines/s (%.1f MB/s), CPU %.1f%%" % (sent / elapsed,
+        sent * len(LINE) / elapsed / 1e6, 100.0 * (cpuTime() - cpu) / elapsed)
+    
+    client.join()
+    os.close(master)
+    os.close(slave)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+###
+# Idle CPU usage and per-message latency of TCPClient on loopback, then
+# write syscalls per command for "system ..." bursts during a telemetry flood
+# Run from repository root: python -m benchmarks.TCPClientBench
+###
+
+import argparse
+import resource
+import socket
+import threading
+import time
+import Queue
+
+from TCPClient import TCPClient
+from WakeupQueue import WakeupQueue
+
+def cpuTime():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered)-1, int(p*len(ordered)))]
+
+def measure(idleS, count):
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+    
+    out_q = WakeupQueue()
+    in_q = Queue.Queue()
+    client = TCPClient(server.getsockname(), out_q, in_q)
+    conn, _ = server.accept()
+    client.start()
+    
+    wall = time.time()
+    cpu = cpuTime()
+    time.sleep(idleS)
+    idle = 100.0 * (cpuTime() - cpu) / (time.time() - wall)
+    
+    rx = []
+    for i in xrange(count):
+        start = time.time()
+        conn.sendall("odin>[Tel] X: 1.000 Y: 2.000 O: 3.000\n")
+        in_q.get(True)
+        rx.append(time.time() - start)
+        
+    tx = []
+    for i in xrange(count):
+        start = time.time()
+        out_q.put("telemetry raw\n")
+        data = ''
+        while not data.endswith('\n'):
+            data += conn.recv(64)
+        tx.append(time.time() - start)
+        
+    flooding = threading.Event()
+    flooding.set()
+    def flood():
+        chunk = "odin>[Tel] X: 1.000 Y: 2.000 O: 3.000\n" * 64
+        while flooding.isSet():
+            conn.sendall(chunk)
+    def drain():
+        while flooding.isSet() or not in_q.empty():
+            try:
+                in_q.get(True, 0.1)
+            except Queue.Empty:
+                pass
+    threads = [threading.Thread(target=flood), threading.Thread(target=drain)]
+    for t in threads:
+        t.start()
+    before = client.counters()
+    for i in xrange(count / 10):
+        for command in ("system cpu\n", "system memory\n", "system battery\n"):
+            out_q.put(command)
+        time.sleep(0.001)
+    time.sleep(0.1)
+    flooding.clear()
+    for t in threads:
+        t.join()
+    after = client.counters()
+    burst = float(after['writes'] - before['writes']) / (after['commands'] - before['commands'])
+        
+    client.join()
+    conn.close()
+    server.close()
+    return idle, rx, tx, burst
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--idle', type=float, default=2.0, help="idle measurement time [s]")
+    parser.add_argument('--count', type=int, default=2000, help="messages per direction")
+    args = parser.parse_args()
+    
+    idle, rx, tx, burst = measure(args.idle, args.count)
+    print "idle CPU:           %8.1f%%" % (idle)
+    print "rx latency p50/p99: %8.1fus %8.1fus" % (percentile(rx, 0.5)*1e6, percentile(rx, 0.99)*1e6)
+    print "tx latency p50/p99: %8.1fus %8.1fus" % (percentile(tx, 0.5)*1e6, percentile(tx, 0.99)*1e6)
+    print "writes per command in bursts during flood: %.2f" % (burst)
@@ -6,10 +6,9 @@ import pyqtgraph as pg
 
 from MainWindow import MainWindow
 from ConnectionManager import ConnectionManager
-import Queue
+from OutgoingScheduler import OutgoingScheduler
 
-outgoing_queue = Queue.Queue()
-incomming_queue = Queue.Queue()     
+outgoing_queue = OutgoingScheduler()
    
 if __name__ == '__main__':
     import sys
@@ -20,11 +19,11 @@ if __name__ == '__main__':
     pg.setConfigOption('antialias', True)
     
     app = QtGui.QApplication(sys.argv)
-    window = MainWindow(incomming_queue, outgoing_queue)
+    window = MainWindow(outgoing_queue)
     app.setActiveWindow(window)
        
     connMngrThread = QtCore.QThread()   
-    connMngr = ConnectionManager(incomming_queue, outgoing_queue)
+    connMngr = ConnectionManager(window.dispatcher, outgoing_queue)
     connMngr.moveToThread(connMngrThread)
     connMngr.result.connect(window.connectDone)
     def startConnection(parameters):